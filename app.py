@@ -1,6 +1,18 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+
 import streamlit as st
-import pandas as pd
-from src.pipeline.predict_pipeline import CustomData, PredictPipeline
+from src.pipeline.predict_pipeline import BatchPredictConfig, BatchPredictPipeline, CustomData, PredictPipeline
+from src.pipeline.prediction_cache import PredictionCache
+from src.utils import TABLE_FORMATS, iter_table_chunks, table_row_count
+
+# Rows scored between progress bar updates in the bulk tab
+BULK_CHUNK_SIZE = 10_000
+BULK_POLL_SECONDS = 0.5
 
 st.set_page_config(page_title="Loan Approval Prediction", layout="wide")
 
@@ -9,6 +21,148 @@ st.markdown("Predict if a loan application will be approved based on applicant d
 
 st.sidebar.header("User Input Features")
 
+@st.cache_resource
+def get_predict_pipeline():
+    # One pipeline per server process, so resubmitted forms are answered from the prediction cache
+    return PredictPipeline(cache=PredictionCache())
+
+@st.cache_resource
+def get_batch_pipelines():
+    # Shared across sessions; bulk rows skip the prediction cache, which unique rows would only churn.
+    # The model itself is loaded once per process by the artifact loader either way.
+    return {
+        predictions_only: BatchPredictPipeline(
+            BatchPredictConfig(chunk_size=BULK_CHUNK_SIZE, predictions_only=predictions_only), PredictPipeline()
+        )
+        for predictions_only in (False, True)
+    }
+
+class BulkScoringJob:
+    '''
+    Scores an uploaded file on a background thread so the app keeps responding while it runs.
+    When the run ends the preview and the scored file are read into memory once and the
+    work directory is removed; it is also removed if the job is dropped with its session.
+    '''
+
+    def __init__(self, batch_pipeline, work_dir, input_path, output_path, total_rows):
+        self.batch_pipeline = batch_pipeline
+        self.input_path = input_path
+        self.output_path = output_path
+        self.output_name = os.path.basename(output_path)
+        self.total_rows = total_rows
+        self.rows_done = 0
+        self.summary = None
+        self.preview = None
+        self.output = None
+        self.error = None
+        self._cleanup = weakref.finalize(self, shutil.rmtree, work_dir, ignore_errors=True)
+        self._thread = threading.Thread(target=self._run, name="bulk-scoring", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _progress(self, rows, chunks):
+        self.rows_done = rows
+
+    def _run(self):
+        try:
+            self.summary = self.batch_pipeline.run(self.input_path, self.output_path, progress=self._progress)
+            self.preview = next(iter_table_chunks(self.output_path, 20), None)
+            with open(self.output_path, "rb") as file_obj:
+                self.output = file_obj.read()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._cleanup()
+
+def start_bulk_job(uploaded_file, predictions_only):
+    previous = st.session_state.get("bulk_job")
+    if previous is not None and previous.running:
+        st.warning("A file is still being scored, wait for it to finish first.")
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="bulk-scoring-")
+    try:
+        name, extension = os.path.splitext(os.path.basename(uploaded_file.name))
+        input_path = os.path.join(work_dir, "input" + extension.lower())
+        with open(input_path, "wb") as file_obj:
+            file_obj.write(uploaded_file.getbuffer())
+        output_path = os.path.join(work_dir, f"{name}_scored{extension.lower()}")
+
+        batch_pipeline = get_batch_pipelines()[predictions_only]
+        # Load the model here rather than inside the worker thread, so load errors show up immediately
+        batch_pipeline.predict_pipeline.loader.get()
+        total_rows = table_row_count(input_path)
+    except Exception:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    st.session_state["bulk_job"] = BulkScoringJob(
+        batch_pipeline, work_dir, input_path, output_path, total_rows
+    ).start()
+
+def show_bulk_progress():
+    job = st.session_state["bulk_job"]
+    if not job.running:
+        # Finished: rerun the whole page once so the results replace this polling section
+        st.rerun()
+
+    fraction = min(job.rows_done / job.total_rows, 1.0) if job.total_rows else 0.0
+    st.progress(fraction, text=f"Scored {job.rows_done:,} of {job.total_rows:,} applications")
+    if not hasattr(st, "fragment"):
+        # Without fragments, poll by re-running the script; the rest of the page stays usable
+        time.sleep(BULK_POLL_SECONDS)
+        st.rerun()
+
+if hasattr(st, "fragment"):
+    # Refresh only the progress section; it is rendered, and so polls, only while a job runs
+    show_bulk_progress = st.fragment(run_every=BULK_POLL_SECONDS)(show_bulk_progress)
+
+def show_bulk_job():
+    job = st.session_state.get("bulk_job")
+    if job is None:
+        return
+    if job.running:
+        show_bulk_progress()
+        return
+
+    if job.error is not None:
+        st.error(f"Error during bulk scoring: {job.error}")
+        return
+
+    st.progress(1.0, text=f"Scored {job.summary['rows']:,} applications in {job.summary['seconds']:.1f}s")
+    st.dataframe(job.preview)
+    st.download_button(
+        "Download scored file",
+        data=job.output,
+        file_name=job.output_name,
+        mime="text/csv" if job.output_name.endswith(".csv") else "application/octet-stream",
+    )
+
+def bulk_upload_scoring():
+    st.markdown(
+        "Upload a file of applications with the same columns as the form "
+        "(a `LoanApproved` column, if present, is ignored) to score them all at once."
+    )
+    uploaded_file = st.file_uploader(
+        "Applications file", type=[extension.lstrip(".") for extension in TABLE_FORMATS.values()]
+    )
+    predictions_only = st.checkbox("Return only the predictions, without the input columns")
+
+    job = st.session_state.get("bulk_job")
+    busy = job is not None and job.running
+    if st.button("Score file", disabled=uploaded_file is None or busy):
+        try:
+            start_bulk_job(uploaded_file, predictions_only)
+        except Exception as e:
+            st.error(f"Could not start bulk scoring: {e}")
+
+    show_bulk_job()
+
 def user_input_features():
     with st.form("loan_form"):
         col1, col2, col3 = st.columns(3)
@@ -150,7 +304,7 @@ def user_input_features():
         st.dataframe(feature_df)
         
         try:
-            pipeline = PredictPipeline()
+            pipeline = get_predict_pipeline()
             prediction = pipeline.predict(feature_df)
             
             if prediction[0] == 1:
@@ -161,4 +315,8 @@ def user_input_features():
             st.error(f"Error during prediction: {e}")
 
 if __name__ == "__main__":
-    user_input_features()
+    single_tab, bulk_tab = st.tabs(["Single application", "Bulk upload"])
+    with single_tab:
+        user_input_features()
+    with bulk_tab:
+        bulk_upload_scoring()
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from src.exception import CustomException
+from src.logger import logging
+
+MANIFEST_SUFFIX = ".manifest.json"
+TRACKED_LIBRARIES = ["numpy", "pandas", "scikit-learn", "dill", "pyarrow"]
+
+
+def manifest_path(file_path):
+    return file_path + MANIFEST_SUFFIX
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def library_versions():
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {"python": sys.version.split()[0]}
+    for library in TRACKED_LIBRARIES:
+        try:
+            versions[library] = version(library)
+        except PackageNotFoundError:
+            pass
+    return versions
+
+
+def atomic_write(file_path, write_func, mode="wb", before_replace=None):
+    '''
+    Calls write_func(file_obj) on a temporary file in the target directory and renames it
+    over file_path, so readers see either the old file or the complete new one.
+    before_replace(tmp_path), if given, runs on the complete file just before the rename.
+    '''
+    dir_path = os.path.dirname(file_path) or "."
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as file_obj:
+            write_func(file_obj)
+            file_obj.flush()
+            os.fsync(file_obj.fileno())
+        if before_replace is not None:
+            before_replace(tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def describe_schema(obj):
+    '''
+    Collects the input/output schema an estimator or array exposes, for the manifest.
+    '''
+    schema = {}
+    for attribute in ("feature_names_in_", "classes_"):
+        value = getattr(obj, attribute, None)
+        if value is not None:
+            schema[attribute.rstrip("_")] = [v.item() if hasattr(v, "item") else v for v in value]
+    n_features_in = getattr(obj, "n_features_in_", None)
+    if n_features_in is not None:
+        schema["n_features_in"] = int(n_features_in)
+    if hasattr(obj, "get_feature_names_out"):
+        try:
+            schema["feature_names_out"] = [str(name) for name in obj.get_feature_names_out()]
+        except Exception:
+            pass
+    if hasattr(obj, "dtype") and hasattr(obj, "shape"):
+        schema["dtype"] = str(obj.dtype)
+        schema["shape"] = list(obj.shape)
+    return schema
+
+
+def read_manifest(file_path):
+    path = manifest_path(file_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file_obj:
+        return json.load(file_obj)
+
+
+def write_manifest(file_path, artifact_format, obj=None, metadata=None, content_path=None):
+    '''
+    Writes <file_path>.manifest.json describing the artifact at file_path, or the finished
+    temporary file content_path that is about to be renamed there.
+    The version counter increases by one on every write to the same path.
+    '''
+    content_path = content_path or file_path
+    stat = os.stat(content_path)
+    previous = read_manifest(file_path)
+    manifest = {
+        "version": (previous or {}).get("version", 0) + 1,
+        "format": artifact_format,
+        "object_type": None if obj is None else f"{type(obj).__module__}.{type(obj).__name__}",
+        "sha256": file_sha256(content_path),
+        "size_bytes": stat.st_size,
+        # The rename keeps the mtime, so a file replaced without its manifest has a different stamp
+        "mtime_ns": stat.st_mtime_ns,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "libraries": library_versions(),
+        "schema": {} if obj is None else describe_schema(obj),
+        "metadata": metadata or {},
+    }
+    atomic_write(
+        manifest_path(file_path), lambda file_obj: json.dump(manifest, file_obj, indent=2), mode="w"
+    )
+    return manifest
+
+
+def write_artifact(file_path, write_func, artifact_format, obj=None, metadata=None):
+    '''
+    Writes an artifact and its manifest as a pair: the content goes to a temporary file,
+    the manifest describing it is published, then the content is renamed into place.
+    '''
+    manifests = []
+    atomic_write(
+        file_path, write_func,
+        before_replace=lambda tmp_path: manifests.append(
+            write_manifest(file_path, artifact_format, obj=obj, metadata=metadata, content_path=tmp_path)
+        ),
+    )
+    return manifests[0]
+
+
+def verify_artifact(file_path, manifest=None, digest=None):
+    '''
+    Raises if file_path was changed in place and no longer matches the sha256 recorded in
+    its manifest. A file replaced without its manifest (a plain copy over the artifact, or
+    a reader between the two renames of write_artifact) only logs a warning, since the
+    manifest then describes a different file. Files without a manifest are accepted as they are.
+    digest, when the caller already hashed the file's content, saves reading it again.
+    '''
+    manifest = manifest or read_manifest(file_path)
+    if manifest is None:
+        logging.info(f"No manifest for {file_path}, skipping integrity check")
+        return None
+    digest = digest or file_sha256(file_path)
+    if digest != manifest["sha256"]:
+        stat = os.stat(file_path)
+        if (stat.st_mtime_ns, stat.st_size) == (manifest.get("mtime_ns"), manifest["size_bytes"]):
+            raise ValueError(f"{file_path} does not match its manifest (sha256 {digest} != {manifest['sha256']})")
+        logging.warning(f"Manifest of {file_path} is stale (the file was replaced without it), loading without verification")
+        return None
+
+    current = library_versions()
+    changed = {
+        library: (recorded, current.get(library))
+        for library, recorded in manifest.get("libraries", {}).items()
+        if current.get(library) != recorded
+    }
+    if changed:
+        logging.warning(f"{file_path} was written with different library versions: {changed}")
+    return manifest
+
+
+def save_pickle(file_path, obj, metadata=None):
+    try:
+        import dill
+
+        return write_artifact(file_path, lambda file_obj: dill.dump(obj, file_obj), "dill", obj=obj, metadata=metadata)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_pickle(file_path, verify=True):
+    try:
+        if verify:
+            return load_pickle_with_digest(file_path)[0]
+
+        import dill
+
+        with open(file_path, "rb") as file_obj:
+            return dill.load(file_obj)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_pickle_with_digest(file_path, verify=True):
+    '''
+    Returns (obj, sha256 of the file). The file is read once; the same bytes are hashed,
+    checked against the manifest when verify is set, and unpickled.
+    '''
+    try:
+        import dill
+
+        with open(file_path, "rb") as file_obj:
+            data = file_obj.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if verify:
+            verify_artifact(file_path, digest=digest)
+        return dill.loads(data), digest
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_array(file_path, array, metadata=None):
+    '''
+    Stores a numeric array as .npy, which load_array can memory-map instead of reading.
+    '''
+    try:
+        import numpy as np
+
+        return write_artifact(
+            file_path, lambda file_obj: np.save(file_obj, array, allow_pickle=False), "npy", obj=array, metadata=metadata
+        )
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_array(file_path, mmap_mode="r", verify=False):
+    try:
+        import numpy as np
+
+        if verify:
+            verify_artifact(file_path)
+        return np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_sparse(file_path, matrix, metadata=None):
+    '''
+    Stores a scipy sparse matrix as an uncompressed .npz, so loading it is a plain read.
+    '''
+    try:
+        import scipy.sparse as sp
+
+        return write_artifact(
+            file_path, lambda file_obj: sp.save_npz(file_obj, matrix, compressed=False), "npz", obj=matrix,
+            metadata={"nnz": int(matrix.nnz), **(metadata or {})}
+        )
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_sparse(file_path, verify=False):
+    try:
+        import scipy.sparse as sp
+
+        if verify:
+            verify_artifact(file_path)
+        return sp.load_npz(file_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
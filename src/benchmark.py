@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from src.logger import logging
+
+
+@dataclass
+class BenchmarkConfig:
+    # Dataset sizes (rows) every stage is benchmarked at; rows are sampled from source_data_path,
+    # or generated synthetically when that file does not exist
+    sizes: list = field(default_factory=lambda: [1_000, 10_000])
+    source_data_path: str = "financial_risk_analysis_large.csv"
+    # Timed repetitions per stage; the best and median run are reported
+    repeats: int = 3
+    # Calls timed for the single-row prediction hot path
+    single_row_repeats: int = 200
+    # Batch sizes the compiled tree model and the sklearn model are timed at, to check
+    # where RoutedTreeModel should switch between them (tree_compiler.SMALL_BATCH_ROWS)
+    routing_rows: list = field(default_factory=lambda: [1, 4, 8, 64])
+    routing_repeats: int = 50
+    # One extra traced run per stage records peak Python/numpy memory with tracemalloc. The
+    # timed runs also record peak RSS, which includes Arrow and other native allocations
+    measure_memory: bool = True
+    random_state: int = 42
+
+
+def _measure(func, repeats, measure_memory):
+    '''
+    Runs func repeats times untraced for timing, then once under tracemalloc for memory.
+    Returns (stats dict, result of the last call).
+
+    tracemalloc sees only allocations made through Python's allocator (Python objects and
+    numpy buffers), not pyarrow's memory pool. peak_rss_mb is the resident-memory peak of
+    the untraced runs, which does include it, and rss_growth_mb how far that peak rose above
+    the RSS the run started at. Both are only reported where the process's high-water mark
+    can be reset between stages (Linux); elsewhere it would be the peak of every stage so far.
+    '''
+    from src.metrics import peak_rss_mb, reset_peak_rss
+
+    timings = []
+    rss_peaks = []
+    result = None
+    for _ in range(repeats):
+        # Right after a reset the high-water mark is the current RSS
+        rss_start = peak_rss_mb() if measure_memory and reset_peak_rss() else None
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        if rss_start is not None:
+            rss_peaks.append((peak_rss_mb(), rss_start))
+
+    stats = {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "repeats": repeats,
+    }
+    if rss_peaks:
+        stats["peak_rss_mb"] = max(peak for peak, _ in rss_peaks)
+        stats["rss_growth_mb"] = max(peak - rss_start for peak, rss_start in rss_peaks)
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            result = func()
+            stats["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return stats, result
+
+
+def _sample_source(config, size, file_path):
+    from src.data_generator import DataGeneratorConfig, generate_dataset
+    from src.utils import load_table, save_table
+
+    if not os.path.exists(config.source_data_path):
+        # No real dataset here, benchmark on synthetic rows of the same schema
+        generate_dataset(DataGeneratorConfig(
+            n_rows=size, output_path=file_path, n_jobs=1, random_state=config.random_state
+        ))
+        return
+    source = load_table(config.source_data_path)
+    sample = source.sample(n=size, replace=size > len(source), random_state=config.random_state)
+    save_table(sample.reset_index(drop=True), file_path)
+
+
+def benchmark_size(config, size, work_dir):
+    '''
+    Benchmarks every stage on a dataset of size rows inside work_dir, which receives the
+    artifacts/ tree the stages write. Returns {stage name: stats}.
+    '''
+    from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+    from src.components.data_transformation import DataTransformation, load_rebalancing, load_transformed_arrays
+    from src.components.model_trainer import ModelTrainer
+    from src.pipeline.artifact_loader import ArtifactLoader, ArtifactLoaderConfig
+    from src.pipeline.predict_pipeline import PredictPipeline
+    from src.schema import TARGET_COLUMN
+    from src.utils import load_table
+
+    results = {}
+    repeats, measure_memory = config.repeats, config.measure_memory
+    source_path = os.path.join(work_dir, f"source_{size}.csv")
+    _sample_source(config, size, source_path)
+
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        ingestion = DataIngestion(DataIngestionConfig(source_data_path=source_path))
+        results["data_ingestion"], (train_path, test_path) = _measure(
+            ingestion.initiate_data_ingestion, repeats, measure_memory
+        )
+
+        transformation = DataTransformation()
+        results["data_transformation"], _ = _measure(
+            lambda: transformation.initiate_data_transformation(train_path, test_path), repeats, measure_memory
+        )
+        X_train, y_train, X_test, y_test = load_transformed_arrays()
+        train_index, sample_weight = load_rebalancing()
+
+        # Candidates are fitted in worker processes, so the memory figures cover only the parent's share
+        trainer = ModelTrainer()
+        results["model_trainer"], _ = _measure(
+            lambda: trainer.initiate_model_trainer(
+                X_train, y_train, X_test, y_test, train_index=train_index, sample_weight=sample_weight
+            ),
+            repeats, measure_memory
+        )
+
+        features = load_table(test_path).drop(columns=[TARGET_COLUMN])
+        loader = ArtifactLoader(ArtifactLoaderConfig(poll_interval=0))
+        pipeline = PredictPipeline(loader=loader)
+
+        # The serving preprocessor on its own, so a slowdown can be traced to mapping or encoding
+        _, preprocessor = loader.get()
+        results["preprocessor_transform"], _ = _measure(
+            lambda: preprocessor.transform(features), repeats, measure_memory
+        )
+
+        single_row = features.head(1)
+        single_stats, _ = _measure(
+            lambda: [pipeline.predict(single_row) for _ in range(config.single_row_repeats)], repeats, measure_memory
+        )
+        for key in ("seconds", "min_seconds"):
+            single_stats[key] /= config.single_row_repeats
+        results["predict_single_row"] = single_stats
+
+        results["predict_batch"], _ = _measure(lambda: pipeline.predict(features), repeats, measure_memory)
+        results.update(_benchmark_routing(config, loader, features))
+    finally:
+        os.chdir(previous_dir)
+
+    for name, stats in results.items():
+        stats["rows"] = size
+        logging.info(f"Benchmark {name}@{size}: {stats}")
+    return results
+
+
+def _benchmark_routing(config, loader, features):
+    '''
+    Per-call time of the compiled tree model and of the sklearn model at each of
+    config.routing_rows, as {"compiled_model_rows_<n>": stats, "sklearn_model_rows_<n>": stats}.
+    Empty when the served model is not a compiled tree model.
+    '''
+    from src.components.tree_compiler import RoutedTreeModel
+
+    model, preprocessor = loader.get()
+    if not isinstance(model, RoutedTreeModel):
+        return {}
+    X = preprocessor.transform(features.head(max(config.routing_rows)))
+
+    results = {}
+    for rows in config.routing_rows:
+        for name, scorer in (("compiled_model", model.compiled), ("sklearn_model", model.model)):
+            batch = X[:rows]
+            stats, _ = _measure(
+                lambda: [scorer.predict_proba(batch) for _ in range(config.routing_repeats)], config.repeats, False
+            )
+            for key in ("seconds", "min_seconds"):
+                stats[key] /= config.routing_repeats
+            results[f"{name}_rows_{rows}"] = stats
+    return results
+
+
+def run_benchmarks(config=None):
+    '''
+    Runs the suite and returns a JSON-serializable report: {"meta": ..., "results": {"stage@rows": stats}}.
+    '''
+    from src.artifact_store import library_versions
+
+    config = config or BenchmarkConfig()
+    config.source_data_path = os.path.abspath(config.source_data_path)
+    logging.info(f"Running benchmarks at sizes {config.sizes}")
+
+    results = {}
+    work_root = tempfile.mkdtemp(prefix="loan-benchmark-")
+    try:
+        for size in config.sizes:
+            work_dir = os.path.join(work_root, str(size))
+            os.makedirs(work_dir)
+            for name, stats in benchmark_size(config, size, work_dir).items():
+                results[f"{name}@{size}"] = stats
+    finally:
+        shutil.rmtree(work_root, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "libraries": library_versions(),
+            "sizes": list(config.sizes),
+            "repeats": config.repeats,
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=0.25):
+    '''
+    Returns the entries that got slower (min_seconds) or hungrier (peak_mb, rss_growth_mb) than the
+    baseline by more than threshold, as a list of dicts. Entries missing on either side are skipped.
+    '''
+    regressions = []
+    for name, stats in report["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        for metric in ("min_seconds", "peak_mb", "rss_growth_mb"):
+            if metric not in stats or not reference.get(metric):
+                continue
+            ratio = stats[metric] / reference[metric]
+            if ratio > 1 + threshold:
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": reference[metric],
+                    "current": stats[metric],
+                    "ratio": ratio,
+                })
+    return regressions
+
+
+def _format_stats(stats):
+    seconds = stats["min_seconds"]
+    timing = f"{seconds * 1e6:.0f} us" if seconds < 0.01 else f"{seconds:.3f} s"
+    memory = f", peak {stats['peak_mb']:.1f} MB" if "peak_mb" in stats else ""
+    if "peak_rss_mb" in stats:
+        memory += f", peak RSS {stats['peak_rss_mb']:.1f} MB (+{stats['rss_growth_mb']:.1f})"
+    return f"{timing}{memory}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time and memory-profile every pipeline stage and the prediction path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BenchmarkConfig().sizes, help="Dataset sizes in rows")
+    parser.add_argument("--source", default=BenchmarkConfig.source_data_path, help="Dataset rows are sampled from")
+    parser.add_argument("--repeats", type=int, default=BenchmarkConfig.repeats)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run and RSS peaks of each stage")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write this run's JSON report")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown/memory growth, 0.25 = 25%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Write this run's report to --baseline")
+    args = parser.parse_args()
+
+    report = run_benchmarks(BenchmarkConfig(
+        sizes=args.sizes,
+        source_data_path=args.source,
+        repeats=args.repeats,
+        measure_memory=not args.no_memory,
+    ))
+    with open(args.output, "w") as file_obj:
+        json.dump(report, file_obj, indent=2)
+    for name, stats in report["results"].items():
+        print(f"{name:32s} {_format_stats(stats)}")
+    print(f"Wrote {args.output}")
+
+    if args.baseline and args.update_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Updated baseline {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file_obj:
+            baseline = json.load(file_obj)
+        regressions = compare_to_baseline(report, baseline, args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['benchmark']} {regression['metric']}: "
+                f"{regression['baseline']:.6g} -> {regression['current']:.6g} ({regression['ratio']:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
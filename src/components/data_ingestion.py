@@ -2,6 +2,9 @@ import os
 import sys
 from src.exception import CustomException
 from src.logger import logging
+from src.schema import column_dtypes
+from src.utils import TABLE_FORMATS, TableWriter, iter_table_chunks, load_table, save_table
+import numpy as np
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
@@ -9,33 +12,76 @@ from dataclasses import dataclass
 
 @dataclass
 class DataIngestionConfig:
-    train_data_path: str=os.path.join('artifacts', "train.csv")
-    test_data_path: str=os.path.join('artifacts', "test.csv")
-    raw_data_path: str=os.path.join('artifacts', "data.csv")
+    # File format of the train/test/raw artifacts handed to later stages: "csv", "parquet" or "feather"
+    artifact_format: str="parquet"
+    # Paths default to artifacts/<name> with the extension of artifact_format
+    train_data_path: str=None
+    test_data_path: str=None
+    raw_data_path: str=None
+    source_data_path: str="financial_risk_analysis_large.csv"
+    # Dtypes applied when reading the source, e.g. {"CreditScore": "int64"}; None uses the
+    # declared schema in src.schema and {} lets pandas infer every column
+    column_dtypes: dict=None
+    test_size: float=0.2
+    random_state: int=42
+    # Rows per chunk for streaming ingestion; None loads the whole file at once
+    chunk_size: int=None
+    save_raw_copy: bool=True
+    # Columns hashed to assign a row to train or test; None hashes the whole row
+    split_key_columns: list=None
+
+    def __post_init__(self):
+        extension = TABLE_FORMATS[self.artifact_format]
+        if self.train_data_path is None:
+            self.train_data_path = os.path.join('artifacts', "train" + extension)
+        if self.test_data_path is None:
+            self.test_data_path = os.path.join('artifacts', "test" + extension)
+        if self.raw_data_path is None:
+            self.raw_data_path = os.path.join('artifacts', "data" + extension)
+        if self.column_dtypes is None:
+            self.column_dtypes = column_dtypes()
+
+def hash_split_mask(df, test_size, random_state, key_columns=None):
+    '''
+    Returns a boolean mask marking the rows that belong to the test split.
+
+    The assignment depends only on the row's key values and the seed, so it is stable
+    across chunk boundaries, chunk sizes and re-runs.
+    '''
+    keys = df if key_columns is None else df[key_columns]
+    hash_key = f"{random_state:016d}"[-16:]
+    hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy()
+    # Map the 64-bit hash to [0, 1) and compare with the requested test share
+    return (hashes >> np.uint64(11)) * (1.0 / (1 << 53)) < test_size
 
 class DataIngestion:
-    def __init__(self):
-        self.ingestion_config=DataIngestionConfig()
+    def __init__(self, ingestion_config=None):
+        self.ingestion_config=ingestion_config or DataIngestionConfig()
     
     def initiate_data_ingestion(self):
         logging.info("Entered the data ingestion method or component")
+        if self.ingestion_config.chunk_size:
+            return self.initiate_streaming_data_ingestion()
         try:
             # Reading the dataset
             # Note: Using absolute path as per user environment or relative if dataset is in project root
             # Assuming dataset is in project root as seen in list_dir 'financial_risk_analysis_large.csv'
-            df = pd.read_csv("financial_risk_analysis_large.csv")
+            df = load_table(self.ingestion_config.source_data_path, dtype=self.ingestion_config.column_dtypes)
             logging.info("Read the dataset as dataframe.")
             
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok = True)
             
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            if self.ingestion_config.save_raw_copy:
+                save_table(df, self.ingestion_config.raw_data_path)
             
             logging.info("Train-test split has been initiated.")
             # Splitting the data first to avoid data leakage
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
+            train_set, test_set = train_test_split(
+                df, test_size=self.ingestion_config.test_size, random_state=self.ingestion_config.random_state
+            )
 
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            save_table(train_set, self.ingestion_config.train_data_path)
+            save_table(test_set, self.ingestion_config.test_data_path)
             
             logging.info("Ingestion of the data has been completed.")
 
@@ -46,6 +92,48 @@ class DataIngestion:
         except Exception as e:
             raise CustomException(e, sys)
 
+    def initiate_streaming_data_ingestion(self):
+        '''
+        Reads the source file in chunks and appends each row to train or test as it goes,
+        so peak memory is bounded by chunk_size rather than by the dataset size.
+        '''
+        try:
+            config = self.ingestion_config
+            logging.info(f"Streaming ingestion of {config.source_data_path} in chunks of {config.chunk_size} rows")
+
+            os.makedirs(os.path.dirname(config.train_data_path), exist_ok=True)
+            writers = {
+                "train": TableWriter(config.train_data_path),
+                "test": TableWriter(config.test_data_path),
+            }
+            if config.save_raw_copy:
+                writers["raw"] = TableWriter(config.raw_data_path)
+
+            row_counts = {"train": 0, "test": 0}
+            try:
+                for chunk in iter_table_chunks(config.source_data_path, config.chunk_size, dtype=config.column_dtypes):
+                    if "raw" in writers:
+                        writers["raw"].write(chunk)
+
+                    test_mask = hash_split_mask(chunk, config.test_size, config.random_state, config.split_key_columns)
+                    writers["train"].write(chunk[~test_mask])
+                    writers["test"].write(chunk[test_mask])
+
+                    row_counts["test"] += int(test_mask.sum())
+                    row_counts["train"] += len(chunk) - int(test_mask.sum())
+            finally:
+                for writer in writers.values():
+                    writer.close()
+
+            logging.info(f"Streaming ingestion completed: {row_counts}")
+
+            return (
+                config.train_data_path,
+                config.test_data_path
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
+
 if __name__ == "__main__":
     obj=DataIngestion()
     train_data, test_data=obj.initiate_data_ingestion()
@@ -3,51 +3,198 @@ from dataclasses import dataclass
 
 import numpy as np 
 import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, FunctionTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
 import os
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object
+from src.artifact_store import load_array, load_sparse, save_array, save_sparse, write_manifest
+from src.metrics import METRICS
+from src.schema import TARGET_COLUMN, column_dtypes
+from src.utils import load_table, save_object
 from sklearn.utils import resample
+from sklearn.utils.class_weight import compute_sample_weight
 
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    # Feature matrices and targets are stored separately as .npy so they can be opened with mmap_mode
+    X_train_file_path = os.path.join('artifacts', "X_train.npy")
+    y_train_file_path = os.path.join('artifacts', "y_train.npy")
+    X_test_file_path = os.path.join('artifacts', "X_test.npy")
+    y_test_file_path = os.path.join('artifacts', "y_test.npy")
+    # Rows transformed at a time when writing the feature matrices
+    transform_chunk_size = 100_000
+    # Sparse mode scales only the numeric columns and keeps the one-hot block as CSR, so
+    # high-cardinality categoricals do not blow up into dense columns. The matrices are
+    # then stored as .npz and read fully instead of memory-mapped.
+    sparse_output = False
+    X_train_sparse_file_path = os.path.join('artifacts', "X_train.npz")
+    X_test_sparse_file_path = os.path.join('artifacts', "X_test.npz")
+    # How the minority class is balanced against the majority in training:
+    #   "index"         draw the same rows as "upsample", but store only their positions into
+    #                   X_train; models are fitted with each row's draw count as its sample
+    #                   weight, and only those without sample_weight gather the rows
+    #   "sample_weight" keep every row once and weight each class by its inverse frequency
+    #   "upsample"      duplicate minority rows in the frame before transforming (legacy)
+    #   "none"          train on the data as it is
+    rebalance_strategy = "index"
+    train_index_file_path = os.path.join('artifacts', "train_index.npy")
+    sample_weight_file_path = os.path.join('artifacts', "sample_weight_train.npy")
+    random_state = 42
+
+REBALANCE_STRATEGIES = ("index", "sample_weight", "upsample", "none")
 
 # Define mappings at module level for pickling
+INSURANCE_STATUS_MAP = {"Insured": 1, "Uninsured": 0}
+EDUCATION_LEVEL_MAP = {
+    'High School': 1,
+    'Associate': 2,
+    'Bachelor': 3,
+    'Master': 4,
+    'Doctorate': 5
+}
+CATEGORY_MAPPINGS = {
+    "HealthInsuranceStatus": INSURANCE_STATUS_MAP,
+    "LifeInsuranceStatus": INSURANCE_STATUS_MAP,
+    "CarInsuranceStatus": INSURANCE_STATUS_MAP,
+    "HomeInsuranceStatus": INSURANCE_STATUS_MAP,
+    "EducationLevel": EDUCATION_LEVEL_MAP,
+}
+
+class CategoryMapper(BaseEstimator, TransformerMixin):
+    '''
+    Vectorized replacement for apply_mappings.
+
+    Each mapped column is turned into integer codes against a precomputed category
+    index and the output is a single take from a precomputed value array, so no per-call
+    dicts or per-element Python lookups are involved. Columns that already have a
+    pandas category dtype only need their (few) categories looked up.
+
+    inplace=True writes the mapped columns into the given frame; otherwise only a shallow
+    copy is made, so untouched columns are never duplicated. Values outside the mapping
+    raise (handle_unknown="error"), are logged (handle_unknown="warn") or silently become
+    NaN like the old apply_mappings (handle_unknown="ignore"). Missing values stay NaN.
+    '''
+
+    def __init__(self, mappings=None, inplace=False, handle_unknown="error"):
+        self.mappings = mappings
+        self.inplace = inplace
+        self.handle_unknown = handle_unknown
+
+    def fit(self, X, y=None):
+        if self.handle_unknown not in ("error", "warn", "ignore"):
+            raise ValueError(f"handle_unknown must be 'error', 'warn' or 'ignore', got {self.handle_unknown!r}")
+
+        mappings = CATEGORY_MAPPINGS if self.mappings is None else self.mappings
+        self.categories_ = {}
+        self.values_ = {}
+        for column, mapping in mappings.items():
+            self.categories_[column] = pd.Index(list(mapping.keys()), dtype=object)
+            # Last slot holds the value for unknown/missing entries
+            self.values_[column] = np.array(list(mapping.values()) + [np.nan], dtype=np.float64)
+
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        return self
+
+    def _codes(self, series, categories):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            category_codes = categories.get_indexer(series.cat.categories)
+            series_codes = series.cat.codes.to_numpy()
+            codes = np.where(series_codes >= 0, category_codes[np.maximum(series_codes, 0)], -1)
+        else:
+            codes = categories.get_indexer(series)
+        return codes
+
+    def _report_unknown(self, column, series, codes):
+        unknown = (codes < 0) & series.notna().to_numpy()
+        if not unknown.any() or self.handle_unknown == "ignore":
+            return
+        values = pd.unique(series[unknown].astype(object))[:10]
+        message = f"Unknown categories in {column} for {int(unknown.sum())} rows: {list(values)}"
+        if self.handle_unknown == "error":
+            raise ValueError(message)
+        logging.warning(message)
+
+    def transform(self, X):
+        if not hasattr(self, "categories_"):
+            self.fit(X)
+
+        df = X if self.inplace else X.copy(deep=False)
+        for column, categories in self.categories_.items():
+            if column not in df.columns:
+                continue
+            series = df[column]
+            codes = self._codes(series, categories)
+            self._report_unknown(column, series, codes)
+            df[column] = self.values_[column][codes]
+        return df
+
+    def get_feature_names_out(self, input_features=None):
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)
+        return self.feature_names_in_
+
+
 def apply_mappings(df):
-    df = df.copy()
-    health_insurance_map = {"Insured": 1, "Uninsured": 0}
-    life_insurance_map = {"Insured": 1, "Uninsured": 0}
-    car_insurance_map = {"Insured": 1, "Uninsured": 0}
-    home_insurance_map = {"Insured": 1, "Uninsured": 0}
-    education_level_map = {
-        'High School': 1,
-        'Associate': 2,
-        'Bachelor': 3,
-        'Master': 4,
-        'Doctorate': 5
-    }
-    
-    if "HealthInsuranceStatus" in df.columns:
-        df["HealthInsuranceStatus"] = df["HealthInsuranceStatus"].map(health_insurance_map)
-    if "LifeInsuranceStatus" in df.columns:
-        df["LifeInsuranceStatus"] = df["LifeInsuranceStatus"].map(life_insurance_map)
-    if "CarInsuranceStatus" in df.columns:
-        df["CarInsuranceStatus"] = df["CarInsuranceStatus"].map(car_insurance_map)
-    if "HomeInsuranceStatus" in df.columns:
-        df["HomeInsuranceStatus"] = df["HomeInsuranceStatus"].map(home_insurance_map)
-    if "EducationLevel" in df.columns:
-        df["EducationLevel"] = df["EducationLevel"].map(education_level_map)
-    
-    return df
+    # Kept so preprocessors pickled before CategoryMapper existed still load
+    return _LEGACY_MAPPER.transform(df)
+
+
+_LEGACY_MAPPER = CategoryMapper(handle_unknown="ignore").fit(None)
+
+def upsample_index(y, random_state=42):
+    '''
+    Row positions of the upsampled training set: every majority (0) row, then minority (1)
+    rows drawn with replacement up to the majority count. Same rows, in the same order, as
+    resampling and concatenating the frames.
+    '''
+    majority = np.flatnonzero(y == 0)
+    minority = np.flatnonzero(y == 1)
+    drawn = resample(minority, replace=True, n_samples=len(majority), random_state=random_state)
+    return np.concatenate([majority, drawn])
+
+def feature_matrix_paths(config):
+    # (X_train, X_test) paths for the configured dense or sparse mode
+    if config.sparse_output:
+        return config.X_train_sparse_file_path, config.X_test_sparse_file_path
+    return config.X_train_file_path, config.X_test_file_path
+
+def matrix_nbytes(X):
+    # In-memory size of a dense array or of a sparse matrix's data, indices and indptr
+    if hasattr(X, "indptr"):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+def rebalance_output_paths(config):
+    # Extra artifacts written by the configured strategy, for the stage cache
+    return {
+        "index": [config.train_index_file_path],
+        "sample_weight": [config.sample_weight_file_path],
+    }.get(config.rebalance_strategy, [])
+
+def check_compiled_preprocessor(preprocessor, df):
+    '''
+    Checks the numpy fast path ArtifactLoader serves against the sklearn preprocessor on df.
+    Returns whether they match bit for bit; a mismatch is logged and recorded in the
+    preprocessor's manifest so serving keeps the sklearn pipeline, but does not stop training.
+    '''
+    from src.components.preprocessor_compiler import compile_preprocessor, verify_compiled_preprocessor
+
+    try:
+        verify_compiled_preprocessor(preprocessor, compile_preprocessor(preprocessor), df)
+        return True
+    except Exception as e:
+        logging.warning(f"Compiled preprocessor failed verification, serving will use sklearn: {e}")
+        return False
 
 class DataTransformation:
-    def __init__(self):
-        self.data_transformation_config = DataTransformationConfig()
+    def __init__(self, transformation_config=None):
+        self.data_transformation_config = transformation_config or DataTransformationConfig()
 
     def get_data_transformer_object(self):
         '''
@@ -61,7 +208,23 @@ class DataTransformation:
             ]
             
             # Step 1: Mapping
-            mapping_transformer = FunctionTransformer(apply_mappings, validate=False)
+            mapping_transformer = CategoryMapper()
+
+            if self.data_transformation_config.sparse_output:
+                # Centering one-hot columns would make them dense, so only the remaining
+                # (numeric and mapped) columns are scaled and the output stays CSR
+                preprocessor_step = ColumnTransformer(
+                    transformers=[
+                        ("cat", OneHotEncoder(drop='first', handle_unknown='ignore', sparse_output=True), categorical_columns),
+                    ],
+                    remainder=StandardScaler(),
+                    sparse_threshold=1.0,
+                    verbose_feature_names_out=False
+                )
+                return Pipeline(steps=[
+                    ("mapping", mapping_transformer),
+                    ("preprocessor", preprocessor_step)
+                ])
 
             # Step 2: Column Transformer (OHE)
             # We want to OHE specific columns and pass through the rest
@@ -90,36 +253,43 @@ class DataTransformation:
         
     def initiate_data_transformation(self, train_path, test_path):
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            # Declared schema dtypes (src/schema.py); CSV artifacts are parsed into them
+            train_df = load_table(train_path, dtype=column_dtypes())
+            test_df = load_table(test_path, dtype=column_dtypes())
 
             logging.info("Read train and test data completed")
 
             logging.info("Obtaining preprocessing object")
             preprocessing_obj = self.get_data_transformer_object()
 
-            target_column_name = "LoanApproved"
+            target_column_name = TARGET_COLUMN
 
-            # Upsampling only on Training Data
-            logging.info("Upsampling minority class in training data")
-            
-            # Separate majority and minority classes
-            df_majority = train_df[train_df[target_column_name] == 0]
-            df_minority = train_df[train_df[target_column_name] == 1]
-            
-            # Upsample minority class
-            df_minority_upsampled = resample(
-                df_minority, 
-                replace=True,     # sample with replacement
-                n_samples=len(df_majority),    # to match majority class
-                random_state=42
-            )
-            
-            # Combine majority class with upsampled minority class
-            train_df_upsampled = pd.concat([df_majority, df_minority_upsampled])
-            train_df = train_df_upsampled # overwrite original train_df with upsampled one
-            
-            logging.info(f"Upsampled train shape: {train_df.shape}")
+            config = self.data_transformation_config
+            strategy = config.rebalance_strategy
+            if strategy not in REBALANCE_STRATEGIES:
+                raise ValueError(f"rebalance_strategy must be one of {REBALANCE_STRATEGIES}, got {strategy!r}")
+
+            if strategy == "upsample":
+                # Upsampling only on Training Data
+                logging.info("Upsampling minority class in training data")
+
+                # Separate majority and minority classes
+                df_majority = train_df[train_df[target_column_name] == 0]
+                df_minority = train_df[train_df[target_column_name] == 1]
+
+                # Upsample minority class
+                df_minority_upsampled = resample(
+                    df_minority,
+                    replace=True,     # sample with replacement
+                    n_samples=len(df_majority),    # to match majority class
+                    random_state=config.random_state
+                )
+
+                # Combine majority class with upsampled minority class
+                train_df_upsampled = pd.concat([df_majority, df_minority_upsampled])
+                train_df = train_df_upsampled # overwrite original train_df with upsampled one
+
+                logging.info(f"Upsampled train shape: {train_df.shape}")
 
             input_feature_train_df = train_df.drop(columns=[target_column_name])
             target_feature_train_df = train_df[target_column_name]
@@ -129,28 +299,167 @@ class DataTransformation:
 
             logging.info(f"Applying preprocessing object on training dataframe and testing dataframe.")
 
-            # Fit on Train, Transform on Train and Test
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
+            # "index" and "sample_weight" never duplicate rows; the scaler sees the balanced
+            # distribution through weights (row multiplicities for "index", the same mean and
+            # variance as the upsampled frame)
+            y_train = target_feature_train_df.to_numpy()
+            train_index = sample_weight = scaler_weight = None
+            if strategy == "index":
+                train_index = upsample_index(y_train, config.random_state)
+                scaler_weight = np.bincount(train_index, minlength=len(y_train)).astype(np.float64)
+            elif strategy == "sample_weight":
+                sample_weight = compute_sample_weight("balanced", y_train)
+                scaler_weight = sample_weight
+            if strategy in ("index", "sample_weight"):
+                logging.info(
+                    f"Rebalanced with {strategy}: {len(y_train)} rows transformed, "
+                    f"{len(train_index) if train_index is not None else len(y_train)} rows seen by the models"
+                )
 
-            train_arr = np.c_[
-                input_feature_train_arr, np.array(target_feature_train_df)
-            ]
-            test_arr = np.c_[
-                input_feature_test_arr, np.array(target_feature_test_df)
-            ]
+            # Fit on Train, Transform on Train and Test. In sparse mode the scaler sits inside
+            # the ColumnTransformer and is fitted on the unweighted rows
+            fit_params = {}
+            if scaler_weight is not None and not config.sparse_output:
+                fit_params["scaler__sample_weight"] = scaler_weight
+            preprocessing_obj.fit(input_feature_train_df, **fit_params)
+            write_matrix = self.transform_to_npz if config.sparse_output else self.transform_to_npy
+            X_train_path, X_test_path = feature_matrix_paths(config)
+            write_matrix(preprocessing_obj, input_feature_train_df, X_train_path)
+            write_matrix(preprocessing_obj, input_feature_test_df, X_test_path)
+            save_array(config.y_train_file_path, y_train)
+            save_array(config.y_test_file_path, target_feature_test_df.to_numpy())
+            self.save_rebalancing(train_index, sample_weight)
+
+            # The compiler only understands the dense pipeline
+            compiled_verified = (
+                None if config.sparse_output else check_compiled_preprocessor(preprocessing_obj, input_feature_test_df)
+            )
 
             logging.info(f"Saved preprocessing object.")
 
             save_object(
                 file_path=self.data_transformation_config.preprocessor_obj_file_path,
-                obj=preprocessing_obj
+                obj=preprocessing_obj,
+                metadata={"compiled_preprocessor_verified": compiled_verified}
             )
 
+            X_train, y_train, X_test, y_test = load_transformed_arrays(config)
+
             return (
-                train_arr,
-                test_arr,
+                X_train,
+                y_train,
+                X_test,
+                y_test,
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def save_rebalancing(self, train_index, sample_weight):
+        '''
+        Writes the arrays of the configured strategy and removes those left over from another
+        one, so a later load never mixes strategies.
+        '''
+        config = self.data_transformation_config
+        for file_path, array in (
+            (config.train_index_file_path, train_index),
+            (config.sample_weight_file_path, sample_weight),
+        ):
+            if array is not None:
+                save_array(file_path, array)
+            elif os.path.exists(file_path):
+                os.remove(file_path)
+
+    def report_matrix_size(self, X, file_path):
+        mode = "sparse" if self.data_transformation_config.sparse_output else "dense"
+        split = os.path.splitext(os.path.basename(file_path))[0]
+        nbytes = matrix_nbytes(X)
+        METRICS.set("feature_matrix_bytes", nbytes, help="In-memory size of a transformed feature matrix", split=split, mode=mode)
+        logging.info(f"{split} feature matrix ({mode}): {X.shape[0]} x {X.shape[1]}, {nbytes / (1024 * 1024):.1f} MB")
+
+    def transform_to_npz(self, preprocessing_obj, df, file_path):
+        '''
+        Transforms df chunk by chunk into one CSR matrix and stores it as .npz.
+        '''
+        try:
+            import scipy.sparse as sp
+
+            chunk_size = self.data_transformation_config.transform_chunk_size
+            matrix = sp.vstack(
+                [preprocessing_obj.transform(df.iloc[start:start + chunk_size]) for start in range(0, len(df), chunk_size)],
+                format="csr"
+            )
+            save_sparse(
+                file_path, matrix,
+                metadata={"feature_names": [str(name) for name in preprocessing_obj.get_feature_names_out()]}
+            )
+            self.report_matrix_size(matrix, file_path)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def transform_to_npy(self, preprocessing_obj, df, file_path):
+        '''
+        Transforms df chunk by chunk straight into a .npy file, so the full output
+        matrix never has to sit in memory next to its input frame.
+        '''
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            chunk_size = self.data_transformation_config.transform_chunk_size
+
+            # Fill a temporary .npy and rename it into place, so readers never map a partial matrix
+            tmp_path = file_path + ".tmp"
+            first = preprocessing_obj.transform(df.iloc[:chunk_size])
+            out = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=first.dtype, shape=(len(df), first.shape[1])
+            )
+            out[:len(first)] = first
+            for start in range(chunk_size, len(df), chunk_size):
+                out[start:start + chunk_size] = preprocessing_obj.transform(df.iloc[start:start + chunk_size])
+            out.flush()
+            del out
+            # Manifest first, then the matrix, so the pair is never out of step for a reader
+            matrix = load_array(tmp_path)
+            write_manifest(
+                file_path, "npy", obj=matrix, content_path=tmp_path,
+                metadata={"feature_names": [str(name) for name in preprocessing_obj.get_feature_names_out()]}
+            )
+            os.replace(tmp_path, file_path)
+            self.report_matrix_size(matrix, file_path)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+def load_transformed_arrays(config=None, mmap_mode="r"):
+    '''
+    Opens the persisted (X_train, y_train, X_test, y_test) without reading them into memory.
+    In sparse mode the X matrices are CSR and read into memory.
+    '''
+    try:
+        config = config or DataTransformationConfig()
+        X_train_path, X_test_path = feature_matrix_paths(config)
+        load_matrix = load_sparse if config.sparse_output else (lambda path: load_array(path, mmap_mode=mmap_mode))
+        return (
+            load_matrix(X_train_path),
+            load_array(config.y_train_file_path, mmap_mode=mmap_mode),
+            load_matrix(X_test_path),
+            load_array(config.y_test_file_path, mmap_mode=mmap_mode),
+        )
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def load_rebalancing(config=None, mmap_mode="r"):
+    '''
+    Returns (train_index, sample_weight) for the configured rebalancing strategy; whichever
+    the strategy does not use is None.
+    '''
+    try:
+        config = config or DataTransformationConfig()
+        train_index = sample_weight = None
+        if config.rebalance_strategy == "index":
+            train_index = load_array(config.train_index_file_path, mmap_mode=mmap_mode)
+        elif config.rebalance_strategy == "sample_weight":
+            sample_weight = load_array(config.sample_weight_file_path, mmap_mode=mmap_mode)
+        return train_index, sample_weight
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -3,58 +3,133 @@ import os
 import sys
 from dataclasses import dataclass
 
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import accuracy_score, classification_report
+from sklearn.preprocessing import StandardScaler
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object, evaluate_models
+from src.schema import TARGET_COLUMN, column_dtypes
+from src.utils import evaluate_models, load_object, load_table, save_object
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = os.path.join("artifacts", "model.pkl")
+    # Worker processes for evaluating candidate models; None uses one per model up to the CPU count
+    n_jobs = None
+    # Incremental retraining: trees added per update for warm_start ensembles
+    incremental_estimators = 10
+    # Whether to update the scaler's running mean/variance with each new batch. None updates it
+    # only for partial_fit models; tree ensembles keep the scaling their existing trees were split on
+    incremental_update_scaler = None
+    # Only consider candidates that initiate_incremental_training can update later
+    incremental_capable_only = False
+
+def supports_incremental_training(model):
+    return hasattr(model, "partial_fit") or (hasattr(model, "warm_start") and hasattr(model, "n_estimators"))
+
+def supports_sparse_input(model):
+    try:
+        from sklearn.utils import get_tags
+    except ImportError:
+        # scikit-learn < 1.6 has no input tags; every built-in candidate accepts CSR
+        return True
+    try:
+        return get_tags(model).input_tags.sparse
+    except Exception:
+        return False
+
+def get_candidate_models(incremental_capable_only=False, sparse_input=False):
+    '''
+    The models compared in the notebooks, plus an SGD logistic model that can be updated
+    with partial_fit. XGBoost is only included when it is installed. sparse_input keeps
+    only the models that can be fitted on a CSR matrix.
+    '''
+    models = {
+        "Logistic Regression": LogisticRegression(max_iter=1000),
+        "Decision Tree": DecisionTreeClassifier(),
+        "Random Forest": RandomForestClassifier(n_jobs=1),
+        "SGD Classifier": SGDClassifier(loss="log_loss", random_state=42),
+    }
+    try:
+        from xgboost import XGBClassifier
+        models["XGBoost"] = XGBClassifier(n_jobs=1)
+    except ImportError:
+        logging.info("xgboost is not installed, skipping the XGBoost candidate")
+
+    if incremental_capable_only:
+        models = {name: model for name, model in models.items() if supports_incremental_training(model)}
+    if sparse_input:
+        models = {name: model for name, model in models.items() if supports_sparse_input(model)}
+    return models
+
+def check_compiled_model(model, X_test):
+    '''
+    Checks that the flat-array traversal ArtifactLoader serves tree models with predicts
+    exactly like model on X_test. Returns None for models that are not compiled (non-tree,
+    or trained on sparse input), otherwise whether they matched; a mismatch is logged and
+    recorded in the model's manifest so serving keeps the sklearn model, but does not stop training.
+    '''
+    if not (hasattr(model, "tree_") or hasattr(model, "estimators_")) or hasattr(X_test, "tocsr"):
+        return None
+
+    from src.components.tree_compiler import compile_tree_model, verify_compiled_tree_model
+
+    try:
+        verify_compiled_tree_model(model, compile_tree_model(model), X_test)
+        return True
+    except Exception as e:
+        logging.warning(f"Compiled tree model failed verification, serving will use sklearn: {e}")
+        return False
 
 class ModelTrainer:
-    def __init__(self):
-        self.model_trainer_config = ModelTrainerConfig()
+    def __init__(self, model_trainer_config=None):
+        self.model_trainer_config = model_trainer_config or ModelTrainerConfig()
+        # Largest peak RSS among the evaluation workers of the last run; None without workers
+        self.workers_peak_rss_mb = None
 
-    def initiate_model_trainer(self, train_array, test_array):
+    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, train_index=None, sample_weight=None):
+        '''
+        train_index and sample_weight come from the transformation's rebalancing strategy
+        (see load_rebalancing); both None trains on X_train as it is.
+        '''
         try:
-            logging.info("Split training and test input data")
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],
-                train_array[:, -1],
-                test_array[:, :-1],
-                test_array[:, -1],
-            )
+            n_rows = X_train.shape[0] if train_index is None else len(train_index)
+            logging.info(f"Training on {n_rows} rows, evaluating on {X_test.shape[0]} rows")
 
-            models = {
-                "Decision Tree": DecisionTreeClassifier()
-            }
+            sparse_input = hasattr(X_train, "tocsr")
+            models = get_candidate_models(self.model_trainer_config.incremental_capable_only, sparse_input)
             
             # Using evaluate_models from utils
             model_report: dict = evaluate_models(
-                X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=models
+                X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=models,
+                n_jobs=self.model_trainer_config.n_jobs, train_index=train_index, sample_weight=sample_weight
             )
             
-            ## To get best model score from dictionary 
-            best_model_score = max(sorted(model_report.values()))
-
-            ## To get best model name from dictionary 
-            best_model_name = list(model_report.keys())[
-                list(model_report.values()).index(best_model_score)
+            worker_peaks = [
+                report["peak_rss_mb"] for report in model_report.values()
+                if report["in_worker"] and report["peak_rss_mb"] is not None
             ]
+            self.workers_peak_rss_mb = max(worker_peaks) if worker_peaks else None
+
+            ## To get best model name and score from the report
+            best_model_name = max(model_report, key=lambda name: model_report[name]["score"])
+            best_model_score = model_report[best_model_name]["score"]
             
             best_model = models[best_model_name]
 
             if best_model_score < 0.6:
                 raise CustomException("No best model found")
             
-            logging.info(f"Best found model on both training and testing dataset")
+            logging.info(f"Best found model on both training and testing dataset: {best_model_name}")
 
             save_object(
                 file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_model
+                obj=best_model,
+                metadata={"compiled_model_verified": check_compiled_model(best_model, X_test)}
             )
 
             predicted = best_model.predict(X_test)
@@ -64,3 +139,82 @@ class ModelTrainer:
             
         except Exception as e:
             raise CustomException(e, sys)
+
+    def initiate_incremental_training(self, new_data_path, preprocessor_path, test_data_path, target_column_name=TARGET_COLUMN):
+        '''
+        Updates the saved preprocessor and model from a batch of newly labeled applications only.
+
+        Models with partial_fit are updated in place; warm_start ensembles grow
+        incremental_estimators new members fit on the batch. The preprocessor's StandardScaler
+        folds the batch into its running mean/variance via partial_fit. Cost scales with the
+        size of the batch, not the full history.
+        '''
+        try:
+            config = self.model_trainer_config
+            model = load_object(config.trained_model_file_path)
+            preprocessor = load_object(preprocessor_path)
+
+            new_df = load_table(new_data_path, dtype=column_dtypes())
+            X_new_df = new_df.drop(columns=[target_column_name])
+            y_new = new_df[target_column_name].to_numpy()
+            logging.info(f"Incremental training on {len(new_df)} new rows with {type(model).__name__}")
+
+            if not supports_incremental_training(model):
+                raise ValueError(
+                    f"{type(model).__name__} supports neither partial_fit nor warm_start. Retrain with "
+                    "'python -m src.pipeline.train_pipeline --incremental-capable-only' (or "
+                    "ModelTrainerConfig.incremental_capable_only = True) so only updatable models are selected"
+                )
+            supports_partial_fit = hasattr(model, "partial_fit")
+
+            update_scaler = config.incremental_update_scaler
+            if update_scaler is None:
+                update_scaler = supports_partial_fit
+
+            scaler = preprocessor[-1]
+            if not isinstance(scaler, StandardScaler):
+                raise ValueError("Incremental training needs the dense preprocessor, which ends in a StandardScaler")
+            features_before_scaling = preprocessor[:-1].transform(X_new_df)
+            if update_scaler:
+                scaler.partial_fit(features_before_scaling)
+                logging.info(f"Scaler now reflects {int(np.max(scaler.n_samples_seen_))} samples")
+            X_new = scaler.transform(features_before_scaling)
+
+            if supports_partial_fit:
+                model.partial_fit(X_new, y_new, classes=model.classes_)
+            else:
+                model.set_params(warm_start=True, n_estimators=model.n_estimators + config.incremental_estimators)
+                model.fit(X_new, y_new)
+
+            test_df = load_table(test_data_path, dtype=column_dtypes())
+            X_test_df = test_df.drop(columns=[target_column_name])
+            X_test = preprocessor.transform(X_test_df)
+            accuracy = accuracy_score(test_df[target_column_name].to_numpy(), model.predict(X_test))
+
+            # The scaler may have moved, so the compiled fast path is verified again
+            from src.components.data_transformation import check_compiled_preprocessor
+
+            save_object(
+                file_path=preprocessor_path, obj=preprocessor,
+                metadata={"compiled_preprocessor_verified": check_compiled_preprocessor(preprocessor, X_test_df)}
+            )
+            save_object(
+                file_path=config.trained_model_file_path, obj=model,
+                metadata={"compiled_model_verified": check_compiled_model(model, X_test)}
+            )
+            logging.info(f"Incremental training completed, test accuracy {accuracy}")
+
+            return accuracy
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+if __name__ == "__main__":
+    # Retrain from the persisted feature matrices without re-running ingestion or transformation
+    from src.components.data_transformation import load_rebalancing, load_transformed_arrays
+
+    train_index, sample_weight = load_rebalancing()
+    accuracy = ModelTrainer().initiate_model_trainer(
+        *load_transformed_arrays(), train_index=train_index, sample_weight=sample_weight
+    )
+    print(f"Training completed. Model Accuracy: {accuracy}")
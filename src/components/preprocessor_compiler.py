@@ -0,0 +1,283 @@
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.data_transformation import CATEGORY_MAPPINGS, CategoryMapper, apply_mappings
+
+# Below this many rows a dict lookup beats building a pandas Index for the categoricals
+SMALL_BATCH_ROWS = 32
+
+
+class LookupColumn:
+    '''
+    One input column whose scaled output is read from a precomputed table.
+
+    table has one row per known category plus a final row for unknown values, and one
+    column per output feature the input column produces (OHE width, or 1 for mappings).
+    handle_unknown follows CategoryMapper for mapped columns; one-hot columns ignore unknowns.
+    '''
+
+    def __init__(self, name, categories, table, start, handle_unknown="ignore"):
+        self.name = name
+        self.handle_unknown = handle_unknown
+        self.categories = list(categories)
+        self.codes = {category: code for code, category in enumerate(self.categories)}
+        self.index = pd.Index(self.categories)
+        self.nan_code = next(
+            (code for code, category in enumerate(self.categories) if category != category),
+            len(self.categories),
+        )
+        self.table = table
+        self.start = start
+        self.stop = start + table.shape[1]
+
+    def encode(self, values):
+        unknown = len(self.categories)
+        if len(values) <= SMALL_BATCH_ROWS:
+            codes = np.array(
+                [
+                    self.nan_code if value is None or value != value else self.codes.get(value, unknown)
+                    for value in values
+                ],
+                dtype=np.intp,
+            )
+        else:
+            # get_indexer already matches NaN against a NaN category
+            codes = self.index.get_indexer(values)
+            codes[codes < 0] = unknown
+
+        if self.handle_unknown != "ignore":
+            self._report_unknown(values, codes == unknown)
+        return codes
+
+    def _report_unknown(self, values, unknown_rows):
+        unknown_rows = unknown_rows & pd.notna(np.asarray(values, dtype=object))
+        if not unknown_rows.any():
+            return
+        found = pd.unique(np.asarray(values, dtype=object)[unknown_rows])[:10]
+        message = f"Unknown categories in {self.name} for {int(unknown_rows.sum())} rows: {list(found)}"
+        if self.handle_unknown == "error":
+            raise ValueError(message)
+        logging.warning(message)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index = pd.Index(self.categories)
+
+
+class CompiledPreprocessor:
+    '''
+    Numpy-only equivalent of the fitted mapping -> ColumnTransformer(OHE) -> StandardScaler pipeline.
+
+    Categorical and mapped columns become table lookups whose rows are already scaled, and the
+    plain numeric columns go through one vectorized (x - mean_) / scale_ step. The arithmetic is
+    the same float64 operations sklearn performs, so results are bit-for-bit identical.
+    '''
+
+    def __init__(self, feature_names_in, lookup_columns, numeric_columns, numeric_positions,
+                 numeric_mean, numeric_scale, n_features_out, feature_names_out):
+        self.feature_names_in_ = list(feature_names_in)
+        self.lookup_columns = lookup_columns
+        self.numeric_columns = list(numeric_columns)
+        self.numeric_positions = np.asarray(numeric_positions, dtype=np.intp)
+        self.numeric_mean = numeric_mean
+        self.numeric_scale = numeric_scale
+        self.n_features_out_ = n_features_out
+        self.feature_names_out_ = np.asarray(feature_names_out, dtype=object)
+
+    def get_feature_names_out(self, input_features=None):
+        return self.feature_names_out_
+
+    def transform(self, X):
+        '''
+        Transforms a DataFrame or a mapping of column name -> sequence of values.
+        '''
+        try:
+            if isinstance(X, pd.DataFrame):
+                n_rows = len(X)
+                numeric = X[self.numeric_columns].to_numpy(dtype=np.float64)
+                column = lambda name: X[name].to_numpy()
+            else:
+                n_rows = len(X[self.numeric_columns[0]]) if self.numeric_columns else len(
+                    X[self.lookup_columns[0].name]
+                )
+                numeric = np.empty((n_rows, len(self.numeric_columns)), dtype=np.float64)
+                for i, name in enumerate(self.numeric_columns):
+                    numeric[:, i] = X[name]
+                column = lambda name: X[name]
+
+            out = np.empty((n_rows, self.n_features_out_), dtype=np.float64)
+            numeric -= self.numeric_mean
+            numeric /= self.numeric_scale
+            out[:, self.numeric_positions] = numeric
+
+            for lookup in self.lookup_columns:
+                out[:, lookup.start:lookup.stop] = lookup.table[lookup.encode(column(lookup.name))]
+
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def transform_record(self, record):
+        '''
+        Transforms a single applicant given as a dict of column name -> scalar.
+        '''
+        try:
+            numeric = np.array([[record[name] for name in self.numeric_columns]], dtype=np.float64)
+            numeric -= self.numeric_mean
+            numeric /= self.numeric_scale
+
+            out = np.empty((1, self.n_features_out_), dtype=np.float64)
+            out[0, self.numeric_positions] = numeric[0]
+            for lookup in self.lookup_columns:
+                out[0, lookup.start:lookup.stop] = lookup.table[lookup.encode((record[lookup.name],))[0]]
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _scale_rows(rows, mean, scale):
+    # Same in-place order of operations as StandardScaler.transform
+    rows = rows.astype(np.float64, copy=True)
+    rows -= mean
+    rows /= scale
+    return rows
+
+
+def compile_preprocessor(pipeline):
+    '''
+    Builds a CompiledPreprocessor from the fitted pipeline returned by
+    DataTransformation.get_data_transformer_object. Raises if the pipeline has a
+    different structure than the one this compiler understands.
+    '''
+    try:
+        if not isinstance(pipeline, Pipeline) or [name for name, _ in pipeline.steps] != [
+            "mapping", "preprocessor", "scaler"
+        ]:
+            raise ValueError("Expected a mapping -> preprocessor -> scaler Pipeline")
+
+        mapping_step = pipeline.named_steps["mapping"]
+        column_transformer = pipeline.named_steps["preprocessor"]
+        scaler = pipeline.named_steps["scaler"]
+
+        if isinstance(mapping_step, CategoryMapper):
+            mappings = {
+                column: dict(zip(categories, mapping_step.values_[column][:-1]))
+                for column, categories in mapping_step.categories_.items()
+            }
+            handle_unknown = mapping_step.handle_unknown
+        elif isinstance(mapping_step, FunctionTransformer) and mapping_step.func is apply_mappings:
+            # Preprocessors pickled before CategoryMapper existed
+            mappings = CATEGORY_MAPPINGS
+            handle_unknown = "ignore"
+        else:
+            raise ValueError("Mapping step is neither a CategoryMapper nor apply_mappings")
+        if not isinstance(column_transformer, ColumnTransformer):
+            raise ValueError("Preprocessor step is not a ColumnTransformer")
+        if not isinstance(scaler, StandardScaler):
+            raise ValueError("Scaler step is not a StandardScaler")
+
+        n_features_out = int(scaler.n_features_in_)
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features_out)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features_out)
+
+        feature_names_in = list(column_transformer.feature_names_in_)
+        lookup_columns = []
+        numeric_columns = []
+        numeric_positions = []
+
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == "drop" or name not in column_transformer.output_indices_:
+                continue
+            output_slice = column_transformer.output_indices_[name]
+            columns = [feature_names_in[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.sparse_output or transformer.handle_unknown != "ignore":
+                    raise ValueError("Only dense OneHotEncoder with handle_unknown='ignore' is supported")
+                if getattr(transformer, "_infrequent_enabled", False):
+                    raise ValueError("Infrequent category grouping is not supported")
+
+                position = output_slice.start
+                drop_idx = transformer.drop_idx_
+                for i, column in enumerate(columns):
+                    categories = transformer.categories_[i]
+                    kept = [k for k in range(len(categories)) if drop_idx is None or drop_idx[i] is None or k != drop_idx[i]]
+                    width = len(kept)
+                    # One-hot rows for every category, plus an all-zero row for unknowns
+                    onehot = np.zeros((len(categories) + 1, width), dtype=np.float64)
+                    for j, k in enumerate(kept):
+                        onehot[k, j] = 1.0
+                    block = slice(position, position + width)
+                    table = _scale_rows(onehot, mean[block], scale[block])
+                    lookup_columns.append(LookupColumn(column, categories, table, position))
+                    position += width
+
+            elif transformer == "passthrough" or (
+                isinstance(transformer, FunctionTransformer) and transformer.func is None
+            ):
+                for offset, column in enumerate(columns):
+                    position = output_slice.start + offset
+                    mapping = mappings.get(column)
+                    if mapping is None:
+                        numeric_columns.append(column)
+                        numeric_positions.append(position)
+                        continue
+                    categories = list(mapping.keys())
+                    values = np.array([mapping[c] for c in categories] + [np.nan], dtype=np.float64)
+                    table = _scale_rows(values.reshape(-1, 1), mean[position], scale[position])
+                    lookup_columns.append(
+                        LookupColumn(column, categories, table, position, handle_unknown=handle_unknown)
+                    )
+            else:
+                raise ValueError(f"Unsupported transformer in ColumnTransformer: {name}")
+
+        numeric_positions = np.asarray(numeric_positions, dtype=np.intp)
+        logging.info(
+            f"Compiled preprocessor: {len(lookup_columns)} lookup columns, {len(numeric_columns)} numeric columns"
+        )
+
+        return CompiledPreprocessor(
+            feature_names_in=feature_names_in,
+            lookup_columns=lookup_columns,
+            numeric_columns=numeric_columns,
+            numeric_positions=numeric_positions,
+            numeric_mean=mean[numeric_positions].copy(),
+            numeric_scale=scale[numeric_positions].copy(),
+            n_features_out=n_features_out,
+            feature_names_out=column_transformer.get_feature_names_out(),
+        )
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def verify_compiled_preprocessor(pipeline, compiled, df):
+    '''
+    Raises if the compiled transform differs from the sklearn pipeline in any bit on df.
+    '''
+    try:
+        expected = pipeline.transform(df)
+        actual = compiled.transform(df)
+        if expected.shape != actual.shape or expected.dtype != actual.dtype:
+            raise ValueError(f"Shape/dtype mismatch: {expected.shape} {expected.dtype} vs {actual.shape} {actual.dtype}")
+        if not np.array_equal(expected.view(np.uint64), actual.view(np.uint64)):
+            mismatched = int((expected.view(np.uint64) != actual.view(np.uint64)).sum())
+            raise ValueError(f"Compiled preprocessor differs from sklearn pipeline in {mismatched} values")
+        logging.info(f"Compiled preprocessor verified bit-for-bit on {len(df)} rows")
+
+    except Exception as e:
+        raise CustomException(e, sys)
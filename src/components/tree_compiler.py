@@ -0,0 +1,194 @@
+import sys
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+# Batches up to this size walk the trees with plain Python indexing, which beats per-level numpy calls.
+# It is also where the compiled model stops beating sklearn, so RoutedTreeModel routes on it:
+# `python -m src.benchmark` reports both per batch size (compiled_model_rows_* vs sklearn_model_rows_*).
+SMALL_BATCH_ROWS = 4
+
+
+class CompiledTreeModel:
+    '''
+    Decision tree (or forest of trees) flattened into contiguous numpy arrays.
+
+    Every tree contributes its feature, threshold, left, right, missing_go_to_left and
+    per-node class-probability arrays, concatenated with per-tree root offsets. Scoring
+    walks all rows of a batch down the trees one level at a time with vectorized gathers,
+    dropping rows from the working set as they reach a leaf,
+    so it needs neither sklearn nor per-call input validation. Only numpy is imported.
+    ArtifactLoader builds it from the pickled model when the model is loaded.
+    '''
+
+    def __init__(self, feature, threshold, left, right, missing_go_to_left, proba, roots, max_depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_go_to_left = missing_go_to_left
+        self.proba = proba
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self._node_lists = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _leaves(self, X, root):
+        node = np.full(X.shape[0], root, dtype=np.intp)
+        # Rows still at an internal node; rows that reached a leaf drop out of later levels
+        active = np.arange(X.shape[0])
+        current = node
+        for _ in range(self.max_depth):
+            left = self.left[current]
+            internal = left >= 0
+            if not internal.all():
+                active, current, left = active[internal], current[internal], left[internal]
+                if not active.size:
+                    break
+            values = X[active, self.feature[current]]
+            go_left = np.where(np.isnan(values), self.missing_go_to_left[current], values <= self.threshold[current])
+            current = np.where(go_left, left, self.right[current])
+            node[active] = current
+        return node
+
+    def _leaf_scalar(self, row, root):
+        feature, threshold, left, right, missing_go_to_left = self._node_lists
+        node = root
+        while left[node] >= 0:
+            value = row[feature[node]]
+            go_left = missing_go_to_left[node] if value != value else value <= threshold[node]
+            node = left[node] if go_left else right[node]
+        return node
+
+    def predict_proba(self, X):
+        try:
+            # sklearn trees compare float32 features against float64 thresholds
+            X = np.asarray(X, dtype=np.float32)
+            if X.shape[0] <= SMALL_BATCH_ROWS:
+                if self._node_lists is None:
+                    self._node_lists = tuple(
+                        array.tolist()
+                        for array in (self.feature, self.threshold, self.left, self.right, self.missing_go_to_left)
+                    )
+                proba = np.zeros((X.shape[0], self.proba.shape[1]))
+                for i, row in enumerate(X.tolist()):
+                    for root in self.roots.tolist():
+                        proba[i] += self.proba[self._leaf_scalar(row, root)]
+                if self.n_trees > 1:
+                    proba /= self.n_trees
+                return proba
+
+            proba = self.proba[self._leaves(X, self.roots[0])].copy()
+            for root in self.roots[1:]:
+                proba += self.proba[self._leaves(X, root)]
+            if self.n_trees > 1:
+                proba /= self.n_trees
+            return proba
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class RoutedTreeModel:
+    '''
+    Serves small batches from the compiled arrays and large ones from the sklearn model.
+
+    The scalar walk removes sklearn's fixed per-call overhead, which dominates for a
+    handful of rows. Past SMALL_BATCH_ROWS the compiled model switches to per-level numpy
+    gathers, and sklearn's tree walk is faster from there on. Both return identical predictions.
+    '''
+
+    def __init__(self, model, compiled, max_compiled_rows=SMALL_BATCH_ROWS):
+        self.model = model
+        self.compiled = compiled
+        self.max_compiled_rows = max_compiled_rows
+        self.classes_ = compiled.classes_
+
+    def _route(self, X):
+        # The flat traversal reads dense rows; sparse input always goes to sklearn
+        if hasattr(X, "tocsr"):
+            return self.model
+        return self.compiled if len(X) <= self.max_compiled_rows else self.model
+
+    def predict(self, X):
+        return self._route(X).predict(X)
+
+    def predict_proba(self, X):
+        return self._route(X).predict_proba(X)
+
+
+def compile_tree_model(model):
+    '''
+    Flattens a fitted DecisionTreeClassifier or RandomForestClassifier. Raises for other models.
+    '''
+    try:
+        if hasattr(model, "tree_"):
+            trees = [model.tree_]
+        elif hasattr(model, "estimators_") and all(hasattr(tree, "tree_") for tree in model.estimators_):
+            trees = [tree.tree_ for tree in model.estimators_]
+        else:
+            raise ValueError(f"{type(model).__name__} is not a tree model")
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output trees are supported")
+
+        feature, threshold, left, right, missing, proba, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            is_leaf = tree.children_left < 0
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            missing.append(
+                np.zeros(tree.node_count, dtype=bool) if missing_go_to_left is None else missing_go_to_left.astype(bool)
+            )
+            value = tree.value[:, 0, :]
+            # Same normalisation sklearn applies in predict_proba
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            proba.append(value / normalizer)
+            offset += tree.node_count
+
+        compiled = CompiledTreeModel(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            missing_go_to_left=np.concatenate(missing),
+            proba=np.concatenate(proba).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max(tree.max_depth for tree in trees),
+            classes=np.asarray(model.classes_),
+        )
+        logging.info(f"Compiled {len(trees)} tree(s) with {offset} nodes into flat arrays")
+        return compiled
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def verify_compiled_tree_model(model, compiled, X):
+    '''
+    Raises if the compiled model's predictions differ from model.predict on X.
+    '''
+    try:
+        expected = model.predict(X)
+        actual = compiled.predict(X)
+        mismatched = int((np.asarray(expected) != actual).sum())
+        if mismatched:
+            raise ValueError(f"Compiled tree model differs from {type(model).__name__} on {mismatched} rows")
+        logging.info(f"Compiled tree model verified on {len(actual)} rows")
+
+    except Exception as e:
+        raise CustomException(e, sys)
@@ -1,18 +1,201 @@
-import logging
+import atexit
+import json
+import logging as _logging
 import os
-from datetime import datetime
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+# Set in a child created by fork; such a process logs to its own file
+_forked = False
 
-LOG_FILE=f"{datetime.now().strftime('%m_%d_%Y_%H,%M_%S')}.log"
-logs_path=os.path.join(os.getcwd(), "logs", LOG_FILE)
-os.makedirs(logs_path, exist_ok=True)
+LOG_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
 
-LOG_FILE_PATH=os.path.join(logs_path, LOG_FILE)
 
+@dataclass
+class LoggingConfig:
+    log_dir: str = field(default_factory=lambda: os.environ.get("LOG_DIR", os.path.join(os.getcwd(), "logs")))
+    file_name: str = "app.log"
+    # Rotate at max_bytes and keep backup_count old files (app.log.1, app.log.2, ...)
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 5
+    # "json" writes one JSON object per line; "text" keeps the original LOG_FORMAT lines
+    format: str = field(default_factory=lambda: os.environ.get("LOG_FORMAT", "json"))
+    level: str = field(default_factory=lambda: os.environ.get("LOG_LEVEL", "INFO"))
 
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s", 
-    level=logging.INFO
-)
 
+# Attributes every LogRecord has; anything else was passed through extra= and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(_logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(_logging.Formatter):
+    '''
+    Formats each record as one JSON line, including any fields passed with extra=.
+    '''
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _is_child_process():
+    # Pool workers import multiprocessing before they run any task, so this needs no import here
+    multiprocessing = sys.modules.get("multiprocessing")
+    return _forked or (multiprocessing is not None and multiprocessing.parent_process() is not None)
+
+
+def log_file_path(config):
+    '''
+    The main process writes config.file_name; child processes (pool workers, forked children)
+    write app.<pid>.log next to it, since several processes rotating one file lose records.
+    '''
+    file_name = config.file_name
+    if _is_child_process():
+        stem, extension = os.path.splitext(file_name)
+        file_name = f"{stem}.{os.getpid()}{extension}"
+    return os.path.join(config.log_dir, file_name)
+
+
+def configure_logging(config=None):
+    '''
+    Routes the root logger through a QueueHandler; a background QueueListener writes the
+    records to a size-rotated file, so logging never blocks the caller on disk I/O.
+    Runs once per process, on the first log call rather than at import time.
+    '''
+    global _configured, _listener
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+
+        # logging.handlers pulls in socket and pickle, so it is imported only when needed
+        import logging.handlers as _handlers
+        import queue
+
+        config = config or LoggingConfig()
+        os.makedirs(config.log_dir, exist_ok=True)
+
+        file_handler = _handlers.RotatingFileHandler(
+            log_file_path(config),
+            maxBytes=config.max_bytes,
+            backupCount=config.backup_count,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter() if config.format == "json" else _logging.Formatter(LOG_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        root = _logging.getLogger()
+        root.addHandler(_handlers.QueueHandler(log_queue))
+        root.setLevel(config.level)
+
+        _listener = _handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        _configured = True
+
+
+def shutdown_logging():
+    '''
+    Flushes queued records to the file and stops the listener thread.
+    '''
+    import logging.handlers as _handlers
+
+    global _configured, _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+        for handler in list(_logging.getLogger().handlers):
+            if isinstance(handler, _handlers.QueueHandler):
+                _logging.getLogger().removeHandler(handler)
+        _configured = False
+
+
+def _reset_after_fork():
+    # A forked child inherits the QueueHandler but not the listener thread, so it sets up its own
+    global _configured, _listener, _configure_lock, _forked
+    _configure_lock = threading.Lock()
+    _listener = None
+    _forked = True
+    if not _configured:
+        return
+    import logging.handlers as _handlers
+
+    root = _logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _handlers.QueueHandler):
+            root.removeHandler(handler)
+    _configured = False
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _emit_timing(name, seconds, fields, stacklevel):
+    configure_logging()
+    logger = _logging.getLogger("src.timing")
+    if logger.isEnabledFor(_logging.INFO):
+        duration_ms = round(seconds * 1000, 3)
+        logger.info(
+            f"{name} took {duration_ms} ms",
+            extra={"event": "timing", "timer": name, "duration_ms": duration_ms, **fields},
+            stacklevel=stacklevel,
+        )
+
+
+def log_timing(name, seconds, **fields):
+    '''
+    Records a timing event, e.g. log_timing("stage", 1.2, stage="data_ingestion").
+    The record carries event="timing", timer and duration_ms as structured fields.
+    '''
+    _emit_timing(name, seconds, fields, stacklevel=3)
+
+
+@contextmanager
+def timed(name, **fields):
+    '''
+    Context manager that logs how long its block took through log_timing.
+    '''
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # Skip this generator and contextlib's __exit__ so the record points at the with block
+        _emit_timing(name, time.perf_counter() - start, fields, stacklevel=4)
+
+
+class _LazyLogging:
+    '''
+    Stands in for the logging module so `from src.logger import logging` has no side effects;
+    the log file is only set up when something is actually logged.
+    '''
+
+    def __getattr__(self, name):
+        configure_logging()
+        return getattr(_logging, name)
+
+
+logging = _LazyLogging()
@@ -0,0 +1,269 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from src.logger import log_timing
+
+# Latency buckets in seconds, fine-grained at the low end where single-row serving lives
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def peak_rss_mb(children=False):
+    '''
+    High-water mark of resident memory in MB for this process (or its largest finished
+    child process), or None where the resource module is unavailable.
+    '''
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss():
+    '''
+    Lowers this process's resident memory high-water mark to its current RSS, so a later
+    peak_rss_mb() covers only what ran in between. Returns False where that is not possible
+    (anything but Linux), in which case peak_rss_mb() stays the process-lifetime peak.
+    '''
+    try:
+        with open("/proc/self/clear_refs", "w") as file_obj:
+            file_obj.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def cpu_seconds():
+    # User + system time of this process and of finished children (e.g. model evaluation workers)
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        '''
+        Estimates the q-quantile by interpolating linearly inside its bucket.
+        '''
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def cumulative(self):
+        total = 0
+        cumulative = []
+        for bucket_count in self.counts:
+            total += bucket_count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry:
+    '''
+    Thread-safe in-process store of counters, gauges and histograms with labels.
+
+    Metrics are created on first use. to_prometheus() renders the Prometheus text
+    exposition format and to_dict() a JSON-friendly view with estimated percentiles.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _series(self, name, metric_type, help_text, labels):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = {"type": metric_type, "help": help_text, "series": {}}
+        elif metric["type"] != metric_type:
+            raise ValueError(f"Metric {name} is a {metric['type']}, not a {metric_type}")
+        return metric["series"], tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, help="", **labels):
+        with self._lock:
+            series, key = self._series(name, "counter", help, labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, help="", **labels):
+        with self._lock:
+            series, key = self._series(name, "gauge", help, labels)
+            series[key] = value
+
+    def observe(self, name, value, help="", buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            series, key = self._series(name, "histogram", help, labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, name, help="", **labels):
+        '''
+        Observes the duration of the with block, in seconds, into histogram name.
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, help=help, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def to_dict(self):
+        with self._lock:
+            result = {}
+            for name, metric in sorted(self._metrics.items()):
+                entries = []
+                for key, value in metric["series"].items():
+                    entry = {"labels": dict(key)}
+                    if isinstance(value, Histogram):
+                        entry.update({
+                            "count": value.count,
+                            "sum": value.sum,
+                            "p50": value.quantile(0.5),
+                            "p95": value.quantile(0.95),
+                            "p99": value.quantile(0.99),
+                            "buckets": dict(zip([str(b) for b in value.buckets] + ["+Inf"], value.cumulative())),
+                        })
+                    else:
+                        entry["value"] = value
+                    entries.append(entry)
+                result[name] = {"type": metric["type"], "help": metric["help"], "series": entries}
+            return result
+
+    def to_prometheus(self):
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (
+                key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+                for key, value in pairs
+            )
+            return "{" + ",".join(escaped) + "}"
+
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                if metric["help"]:
+                    lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in metric["series"].items():
+                    if isinstance(value, Histogram):
+                        bounds = [repr(float(b)) for b in value.buckets] + ["+Inf"]
+                        for bound, total in zip(bounds, value.cumulative()):
+                            lines.append(f"{name}_bucket{label_text(key, [('le', bound)])} {total}")
+                        lines.append(f"{name}_sum{label_text(key)} {value.sum}")
+                        lines.append(f"{name}_count{label_text(key)} {value.count}")
+                    else:
+                        lines.append(f"{name}{label_text(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class StageRecord:
+    '''
+    Resource usage of one pipeline stage; rows can be filled in inside the tracked block.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_rss_mb = None
+        # Largest peak RSS of the worker processes this stage ran; set by the stage itself,
+        # since RUSAGE_CHILDREN only knows the largest child of the whole process lifetime
+        self.workers_peak_rss_mb = None
+        self.extra = {}
+
+    def to_dict(self):
+        return {
+            "stage": self.name,
+            "rows": self.rows,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_rss_mb": self.peak_rss_mb,
+            "workers_peak_rss_mb": self.workers_peak_rss_mb,
+            **self.extra,
+        }
+
+
+@contextmanager
+def track_stage(name, registry=METRICS, **extra):
+    '''
+    Measures wall time, CPU time (including finished child processes), peak RSS and rows
+    processed for the with block. Rows and the workers' peak RSS can be filled in inside
+    the block. Yields a StageRecord, publishes it as gauges labelled stage=name and logs
+    it as a timing event.
+    '''
+    record = StageRecord(name)
+    record.extra.update(extra)
+    start_wall, start_cpu = time.perf_counter(), cpu_seconds()
+    try:
+        yield record
+    finally:
+        record.wall_seconds = time.perf_counter() - start_wall
+        record.cpu_seconds = cpu_seconds() - start_cpu
+        record.peak_rss_mb = peak_rss_mb()
+
+        registry.set("train_stage_wall_seconds", record.wall_seconds, help="Wall time of the stage", stage=name)
+        registry.set("train_stage_cpu_seconds", record.cpu_seconds, help="CPU time of the stage and its workers", stage=name)
+        if record.peak_rss_mb is not None:
+            registry.set("train_stage_peak_rss_mb", record.peak_rss_mb, help="Process RSS high-water mark after the stage", stage=name)
+        if record.workers_peak_rss_mb is not None:
+            registry.set(
+                "train_stage_workers_peak_rss_mb", record.workers_peak_rss_mb,
+                help="Largest peak RSS of the stage's worker processes", stage=name
+            )
+        if record.rows is not None:
+            registry.set("train_stage_rows", record.rows, help="Rows processed by the stage", stage=name)
+        log_timing("train_stage", record.wall_seconds, **{k: v for k, v in record.to_dict().items() if k != "wall_seconds"})
+
+
+def format_stage_report(records):
+    '''
+    Renders StageRecords as a fixed-width table for the end-of-run summary.
+    '''
+    def cell(value, fmt):
+        return "-" if value is None else format(value, fmt)
+
+    lines = [f"{'stage':24s} {'rows':>10s} {'wall s':>9s} {'cpu s':>9s} {'peak rss MB':>12s} {'workers MB':>11s}"]
+    for record in records:
+        lines.append(
+            f"{record.name:24s} {cell(record.rows, 'd'):>10s} {cell(record.wall_seconds, '.2f'):>9s} "
+            f"{cell(record.cpu_seconds, '.2f'):>9s} {cell(record.peak_rss_mb, '.1f'):>12s} "
+            f"{cell(record.workers_peak_rss_mb, '.1f'):>11s}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from src.artifact_store import file_sha256, load_pickle_with_digest, read_manifest
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import METRICS
+
+
+@dataclass
+class ArtifactLoaderConfig:
+    model_path: str = os.path.join("artifacts", "model.pkl")
+    preprocessor_path: str = os.path.join("artifacts", "preprocessor.pkl")
+    # Seconds between background checks for changed artifacts (0 disables the watcher)
+    poll_interval: float = 5.0
+    # Serve through the numpy fast path when the fitted pipeline can be compiled
+    compile_preprocessor: bool = True
+    # Serve batches of up to compiled_model_max_rows through the flat-array tree traversal;
+    # None routes on tree_compiler.SMALL_BATCH_ROWS, where sklearn starts to win
+    compile_model: bool = True
+    compiled_model_max_rows: Optional[int] = None
+
+
+def file_fingerprint(file_path):
+    '''
+    Returns a cheap (mtime, size) stamp used to decide whether a file needs re-hashing.
+    '''
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ArtifactLoader:
+    '''
+    Holds the unpickled model and preprocessor for the lifetime of the process.
+
+    Artifacts are loaded on first use and then served from memory. A daemon thread
+    polls the files; when the mtime/size stamp changes the content hash is recomputed
+    and, only if it differs, the new pair is loaded off the request path and swapped in.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or ArtifactLoaderConfig()
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._versioned = None
+        self._fingerprints = None
+        self._hashes = None
+        self._watcher = None
+        self._stop_event = threading.Event()
+
+    @property
+    def paths(self):
+        return (self.config.model_path, self.config.preprocessor_path)
+
+    @property
+    def version(self):
+        '''
+        Content hash of the currently served artifacts, or None before the first load.
+        '''
+        versioned = self._versioned
+        return None if versioned is None else versioned[2]
+
+    def get(self):
+        '''
+        Returns (model, preprocessor), loading them on the first call.
+        '''
+        artifacts = self._artifacts
+        if artifacts is not None:
+            return artifacts
+
+        with self._lock:
+            if self._artifacts is None:
+                self._load()
+                self._start_watcher()
+            return self._artifacts
+
+    def get_versioned(self):
+        '''
+        Returns (model, preprocessor, version) taken from one consistent snapshot.
+        '''
+        self.get()
+        return self._versioned
+
+    def reload_if_changed(self):
+        '''
+        Reloads the artifacts if any file changed on disk. Returns True when a swap happened.
+        '''
+        try:
+            fingerprints = tuple(file_fingerprint(path) for path in self.paths)
+            if fingerprints == self._fingerprints:
+                return False
+
+            hashes = tuple(file_sha256(path) for path in self.paths)
+            if hashes == self._hashes:
+                # Touched but identical content, remember the new stamp and keep serving
+                self._fingerprints = fingerprints
+                return False
+
+            logging.info("Artifact change detected, reloading model and preprocessor")
+            with self._lock:
+                self._load()
+            return True
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _load(self):
+        # Called with self._lock held
+        try:
+            start = time.perf_counter()
+            model_path, preprocessor_path = self.paths
+            fingerprints = tuple(file_fingerprint(path) for path in self.paths)
+
+            logging.info(f"Loading model from {model_path} and preprocessor from {preprocessor_path}")
+            # Each file is read once: the bytes that are verified and hashed are the ones unpickled
+            model, model_hash = load_pickle_with_digest(model_path)
+            preprocessor, preprocessor_hash = load_pickle_with_digest(preprocessor_path)
+            hashes = (model_hash, preprocessor_hash)
+            if self.config.compile_preprocessor:
+                preprocessor = self._compile(preprocessor)
+            if self.config.compile_model:
+                model = self._compile_model(model)
+
+            # Single reference assignments so readers never see a mixed pair
+            self._versioned = (model, preprocessor, hashlib.sha256("".join(hashes).encode()).hexdigest()[:16])
+            self._artifacts = (model, preprocessor)
+            self._fingerprints = fingerprints
+            self._hashes = hashes
+            METRICS.observe(
+                "artifact_load_seconds", time.perf_counter() - start,
+                help="Time to read, verify and compile the model and preprocessor"
+            )
+            logging.info(f"Loaded artifacts version {self.version}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _compile(self, preprocessor):
+        from src.components.preprocessor_compiler import compile_preprocessor
+
+        manifest = read_manifest(self.config.preprocessor_path) or {}
+        if manifest.get("metadata", {}).get("compiled_preprocessor_verified") is False:
+            logging.info("Compiled preprocessor failed verification at training time, serving the sklearn pipeline")
+            return preprocessor
+        try:
+            return compile_preprocessor(preprocessor)
+        except Exception as e:
+            logging.info(f"Preprocessor cannot be compiled, serving the sklearn pipeline: {e}")
+            return preprocessor
+
+    def _compile_model(self, model):
+        if not (hasattr(model, "tree_") or hasattr(model, "estimators_")):
+            return model
+
+        from src.components.tree_compiler import SMALL_BATCH_ROWS, RoutedTreeModel, compile_tree_model
+
+        manifest = read_manifest(self.config.model_path) or {}
+        if manifest.get("metadata", {}).get("compiled_model_verified") is False:
+            logging.info("Compiled tree model failed verification at training time, serving the sklearn model")
+            return model
+        try:
+            max_rows = self.config.compiled_model_max_rows
+            return RoutedTreeModel(model, compile_tree_model(model), SMALL_BATCH_ROWS if max_rows is None else max_rows)
+        except Exception as e:
+            logging.info(f"Model cannot be compiled, serving the sklearn model: {e}")
+            return model
+
+    def _start_watcher(self):
+        if self.config.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, name="artifact-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.config.poll_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                # Keep serving the previous artifacts if the new ones are unreadable
+                logging.info(f"Artifact reload failed, keeping current version: {e}")
+
+
+_loaders = {}
+_loaders_lock = threading.Lock()
+
+
+def get_artifact_loader(config=None):
+    '''
+    Returns the process-wide loader for the given artifact paths, creating it once.
+    '''
+    config = config or ArtifactLoaderConfig()
+    key = (os.path.abspath(config.model_path), os.path.abspath(config.preprocessor_path))
+    with _loaders_lock:
+        loader = _loaders.get(key)
+        if loader is None:
+            loader = ArtifactLoader(config)
+            _loaders[key] = loader
+        return loader
@@ -0,0 +1,467 @@
+import argparse
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+from src.artifact_store import atomic_write, manifest_path
+from src.exception import CustomException
+from src.logger import log_timing, logging
+from src.metrics import METRICS
+from src.pipeline.artifact_loader import ArtifactLoader, ArtifactLoaderConfig, get_artifact_loader
+
+MODEL_FILE = "model.pkl"
+PREPROCESSOR_FILE = "preprocessor.pkl"
+# Pointer files in the registry root naming the version that serves traffic and the one
+# scored alongside it; every serving process follows them
+ACTIVE_POINTER = "ACTIVE"
+SHADOW_POINTER = "SHADOW"
+
+
+@dataclass
+class ModelRegistryConfig:
+    # One sub-directory per version, each holding model.pkl and preprocessor.pkl
+    root_dir: str = os.path.join("artifacts", "models")
+    # Seconds between checks of the pointer files (0 disables the watcher)
+    poll_interval: float = 5.0
+    # Rows pushed through a freshly loaded version before it takes traffic; no warm-up when missing
+    warmup_data_path: str = os.path.join("artifacts", "test.parquet")
+    warmup_rows: int = 64
+    warmup_rounds: int = 3
+    # Share of scored requests the shadow version also scores, and how many may wait for it;
+    # requests beyond that are not shadowed rather than slowing down serving
+    shadow_sample_rate: float = 1.0
+    shadow_queue_size: int = 100
+    # Versions kept loaded after being switched away from, so a rollback is instant
+    keep_previous: int = 1
+
+
+def version_dir(root_dir, name):
+    if not name or name.startswith(".") or os.sep in name or name in (ACTIVE_POINTER, SHADOW_POINTER):
+        raise ValueError(f"Invalid model version name {name!r}")
+    return os.path.join(root_dir, name)
+
+
+def list_versions(root_dir):
+    if not os.path.isdir(root_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(root_dir)
+        if not name.startswith(".") and os.path.exists(os.path.join(root_dir, name, MODEL_FILE))
+    )
+
+
+def read_pointer(root_dir, pointer):
+    path = os.path.join(root_dir, pointer)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file_obj:
+        return file_obj.read().strip() or None
+
+
+def write_pointer(root_dir, pointer, name):
+    '''
+    Points pointer at version name (None removes it). The file is replaced atomically, so
+    watchers never read a half-written name.
+    '''
+    path = os.path.join(root_dir, pointer)
+    if name is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    if name not in list_versions(root_dir):
+        raise ValueError(f"Model version {name!r} is not published in {root_dir}")
+    atomic_write(path, lambda file_obj: file_obj.write(name + "\n"), mode="w")
+
+
+def publish_version(
+    name, model_path=os.path.join("artifacts", "model.pkl"),
+    preprocessor_path=os.path.join("artifacts", "preprocessor.pkl"), root_dir=ModelRegistryConfig.root_dir
+):
+    '''
+    Copies a trained model and preprocessor (with their manifests) into the registry as
+    version name. The version directory is filled under a temporary name and renamed into
+    place, so a watcher never sees a partial version. Published versions are never overwritten.
+    '''
+    try:
+        target = version_dir(root_dir, name)
+        if os.path.exists(target):
+            raise ValueError(f"Model version {name!r} already exists in {root_dir}")
+        os.makedirs(root_dir, exist_ok=True)
+
+        staging = tempfile.mkdtemp(dir=root_dir, prefix=f".{name}.")
+        try:
+            for source, file_name in ((model_path, MODEL_FILE), (preprocessor_path, PREPROCESSOR_FILE)):
+                shutil.copy2(source, os.path.join(staging, file_name))
+                if os.path.exists(manifest_path(source)):
+                    shutil.copy2(manifest_path(source), manifest_path(os.path.join(staging, file_name)))
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        logging.info(f"Published model version {name} to {target}")
+        return target
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ModelRegistry:
+    '''
+    Serves the active model version of a registry directory and hot-swaps versions without
+    a cold request.
+
+    A new version is loaded (and compiled) next to the current one and warmed with sample
+    rows, all off the request path; traffic then moves over in one reference assignment.
+    A shadow version can score a sample of the same rows on a background thread, with its
+    agreement with the active version exported as metrics.
+
+    It has the get()/get_versioned()/version interface of ArtifactLoader, so PredictPipeline
+    takes either. Until a version is activated it serves the plain artifacts/ loader, and the
+    watcher picks up the first ACTIVE pointer without a restart.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or ModelRegistryConfig()
+        # Serializes loading and switching; request threads only read the tuples below
+        self._lock = threading.RLock()
+        self._loaders = {}
+        self._active = None
+        # artifacts/ loader served while no version is active, resolved once in _start()
+        self._fallback = None
+        self._shadow = None
+        self._previous = []
+        self._warmup_features = None
+        self._shadow_queue = queue.Queue(maxsize=self.config.shadow_queue_size)
+        self._shadow_thread = None
+        self._watcher = None
+        self._started = False
+        self._stop_event = threading.Event()
+
+    @property
+    def version(self):
+        return self._active_loader().version
+
+    @property
+    def active_name(self):
+        active = self._active
+        return None if active is None else active[0]
+
+    @property
+    def shadow_name(self):
+        shadow = self._shadow
+        return None if shadow is None else shadow[0]
+
+    def get(self):
+        return self._active_loader().get()
+
+    def get_versioned(self):
+        return self._active_loader().get_versioned()
+
+    def _active_loader(self):
+        active = self._active
+        if active is None:
+            self._start()
+            active = self._active
+            if active is None:
+                # Nothing published yet: serve artifacts/ until the watcher sees an ACTIVE pointer
+                return self._fallback
+        return active[1]
+
+    def _start(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            # Looked up here, not per request, since get_artifact_loader() takes a process-wide lock
+            self._fallback = get_artifact_loader()
+            name = read_pointer(self.config.root_dir, ACTIVE_POINTER)
+            if name is not None:
+                self.activate(name)
+                shadow = read_pointer(self.config.root_dir, SHADOW_POINTER)
+                if shadow is not None:
+                    self.set_shadow(shadow)
+            self._start_watcher()
+            self._started = True
+
+    def preload(self, name):
+        '''
+        Loads and warms version name without serving it. Returns its loader.
+        '''
+        try:
+            with self._lock:
+                loader = self._loaders.get(name)
+                if loader is not None:
+                    return loader
+
+                start = time.perf_counter()
+                directory = version_dir(self.config.root_dir, name)
+                # Published versions never change, so their loaders do not poll the files
+                loader = ArtifactLoader(ArtifactLoaderConfig(
+                    model_path=os.path.join(directory, MODEL_FILE),
+                    preprocessor_path=os.path.join(directory, PREPROCESSOR_FILE),
+                    poll_interval=0,
+                ))
+                loader.get()
+                self._warm_up(name, loader)
+                self._loaders[name] = loader
+
+                elapsed = time.perf_counter() - start
+                METRICS.observe("model_preload_seconds", elapsed, help="Time to load and warm a model version")
+                log_timing("model_preload", elapsed, version=name)
+                return loader
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _warm_up(self, name, loader):
+        features = self._warmup_sample()
+        if features is None:
+            logging.info(f"No warm-up rows at {self.config.warmup_data_path}, skipping warm-up of {name}")
+            return
+        model, preprocessor = loader.get()
+        # Both the single-row and the batch paths, so lazy imports and compiled routes are exercised
+        for _ in range(self.config.warmup_rounds):
+            for rows in (features.iloc[:1], features):
+                X = preprocessor.transform(rows)
+                model.predict(X)
+                if hasattr(model, "predict_proba"):
+                    model.predict_proba(X)
+
+    def _warmup_sample(self):
+        if self._warmup_features is None and os.path.exists(self.config.warmup_data_path):
+            from src.schema import FEATURE_COLUMNS
+            from src.utils import iter_table_chunks
+
+            chunk = next(iter_table_chunks(self.config.warmup_data_path, self.config.warmup_rows), None)
+            if chunk is not None and len(chunk):
+                self._warmup_features = chunk[FEATURE_COLUMNS].head(self.config.warmup_rows)
+        return self._warmup_features
+
+    def activate(self, name):
+        '''
+        Preloads version name if needed, then moves all traffic to it at once.
+        '''
+        try:
+            with self._lock:
+                loader = self.preload(name)
+                previous = self._active
+                if previous is not None and previous[0] == name:
+                    return
+                # Single reference assignment: a request sees either the old or the new version
+                self._active = (name, loader)
+                if previous is not None:
+                    self._previous = [n for n in self._previous if n != previous[0]] + [previous[0]]
+                self._evict()
+
+                METRICS.inc("model_switches_total", help="Active model version changes")
+                logging.info(f"Active model version is now {name} (was {previous[0] if previous else None})")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def rollback(self):
+        '''
+        Switches back to the version active before the current one and points ACTIVE at it,
+        so the watcher (and every other serving process) stays on it.
+        '''
+        with self._lock:
+            if not self._previous:
+                raise ValueError("No previous model version to roll back to")
+            name = self._previous[-1]
+            write_pointer(self.config.root_dir, ACTIVE_POINTER, name)
+            self.activate(name)
+
+    def set_shadow(self, name):
+        '''
+        Scores a sample of served rows with version name in the background; None stops shadowing.
+        '''
+        try:
+            with self._lock:
+                if name is None:
+                    self._shadow = None
+                else:
+                    self._shadow = (name, self.preload(name))
+                    self._start_shadow_thread()
+                self._evict()
+                logging.info(f"Shadow model version is now {name}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _evict(self):
+        # Called with self._lock held; requests still holding an evicted model finish with it
+        keep = {name for name in (self.active_name, self.shadow_name) if name is not None}
+        recent = [name for name in self._previous if name not in keep]
+        if self.config.keep_previous > 0:
+            keep.update(recent[-self.config.keep_previous:])
+        self._previous = [name for name in self._previous if name in keep]
+        for name in list(self._loaders):
+            if name not in keep:
+                del self._loaders[name]
+                logging.info(f"Unloaded model version {name}")
+
+    def submit_shadow(self, features, predictions):
+        '''
+        Queues rows the active version just scored for the shadow version. Never blocks.
+        '''
+        shadow = self._shadow
+        # A shadow version that has since been activated has nothing to be compared with
+        if shadow is None or shadow[0] == self.active_name or random.random() >= self.config.shadow_sample_rate:
+            return
+        try:
+            self._shadow_queue.put_nowait((shadow, features, predictions))
+        except queue.Full:
+            METRICS.inc("shadow_dropped_total", help="Batches not shadowed because the queue was full")
+
+    def _start_shadow_thread(self):
+        if self._shadow_thread is not None:
+            return
+        self._shadow_thread = threading.Thread(target=self._shadow_worker, name="shadow-scorer", daemon=True)
+        self._shadow_thread.start()
+
+    def _shadow_worker(self):
+        import numpy as np
+
+        while True:
+            (name, loader), features, predictions = self._shadow_queue.get()
+            try:
+                start = time.perf_counter()
+                model, preprocessor = loader.get()
+                shadow_predictions = model.predict(preprocessor.transform(features))
+                elapsed = time.perf_counter() - start
+
+                disagreements = int((np.asarray(shadow_predictions) != np.asarray(predictions)).sum())
+                METRICS.inc("shadow_rows_total", len(shadow_predictions), help="Rows scored by the shadow version", version=name)
+                METRICS.inc(
+                    "shadow_disagreements_total", disagreements,
+                    help="Shadow predictions that differ from the active version", version=name
+                )
+                METRICS.observe("shadow_score_seconds", elapsed, help="Time to score one shadowed batch", version=name)
+            except Exception as e:
+                logging.info(f"Shadow scoring with {name} failed: {e}")
+            finally:
+                self._shadow_queue.task_done()
+
+    def _start_watcher(self):
+        if self.config.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while not self._stop_event.wait(self.config.poll_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                # Keep serving the current version if the new one cannot be loaded
+                logging.info(f"Model registry update failed, keeping current versions: {e}")
+
+    def sync(self):
+        '''
+        Follows the ACTIVE and SHADOW pointer files. Returns True when anything changed.
+        '''
+        active = read_pointer(self.config.root_dir, ACTIVE_POINTER)
+        shadow = read_pointer(self.config.root_dir, SHADOW_POINTER)
+        changed = False
+        if active is not None and active != self.active_name:
+            self.activate(active)
+            changed = True
+        if shadow != self.shadow_name:
+            self.set_shadow(shadow)
+            changed = True
+        return changed
+
+    def stop(self):
+        self._stop_event.set()
+
+    def status(self):
+        shadow_rows = shadow_disagreements = None
+        shadow = self.shadow_name
+        if shadow is not None:
+            metrics = METRICS.to_dict()
+            for metric_name in ("shadow_rows_total", "shadow_disagreements_total"):
+                for series in metrics.get(metric_name, {}).get("series", []):
+                    if series["labels"].get("version") == shadow:
+                        if metric_name == "shadow_rows_total":
+                            shadow_rows = series["value"]
+                        else:
+                            shadow_disagreements = series["value"]
+        return {
+            "active": self.active_name,
+            "shadow": shadow,
+            "loaded": sorted(self._loaders),
+            "previous": list(self._previous),
+            "shadow_queue": self._shadow_queue.qsize(),
+            "shadow_rows": shadow_rows,
+            "shadow_agreement": None if not shadow_rows else 1 - (shadow_disagreements or 0) / shadow_rows,
+        }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_serving_loader(config=None):
+    '''
+    Returns the process-wide ModelRegistry of config.root_dir. It serves the plain
+    artifacts/ loader until that directory gets an active version.
+    '''
+    config = config or ModelRegistryConfig()
+    key = os.path.abspath(config.root_dir)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = ModelRegistry(config)
+        return registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish model versions and choose the active and shadow ones.")
+    parser.add_argument("--root-dir", default=ModelRegistryConfig.root_dir)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    publish = commands.add_parser("publish", help="Copy the trained artifacts into the registry as a new version")
+    publish.add_argument("name")
+    publish.add_argument("--model", default=os.path.join("artifacts", "model.pkl"))
+    publish.add_argument("--preprocessor", default=os.path.join("artifacts", "preprocessor.pkl"))
+    role = publish.add_mutually_exclusive_group()
+    role.add_argument("--activate", action="store_true", help="Serve the new version once it is published")
+    role.add_argument("--shadow", action="store_true", help="Shadow-score the new version once it is published")
+
+    activate = commands.add_parser("activate", help="Serve a published version")
+    activate.add_argument("name")
+    shadow = commands.add_parser("shadow", help="Shadow-score a published version")
+    shadow.add_argument("name", nargs="?", help="Omit to stop shadow scoring")
+    commands.add_parser("list", help="Show the published versions")
+    args = parser.parse_args()
+
+    def activate_version(name):
+        write_pointer(args.root_dir, ACTIVE_POINTER, name)
+        # The promoted version stops being scored against itself
+        if read_pointer(args.root_dir, SHADOW_POINTER) == name:
+            write_pointer(args.root_dir, SHADOW_POINTER, None)
+
+    if args.command == "publish":
+        publish_version(args.name, args.model, args.preprocessor, args.root_dir)
+        if args.activate:
+            activate_version(args.name)
+        elif args.shadow:
+            write_pointer(args.root_dir, SHADOW_POINTER, args.name)
+    elif args.command == "activate":
+        activate_version(args.name)
+    elif args.command == "shadow":
+        write_pointer(args.root_dir, SHADOW_POINTER, args.name)
+    else:
+        active = read_pointer(args.root_dir, ACTIVE_POINTER)
+        shadowed = read_pointer(args.root_dir, SHADOW_POINTER)
+        for name in list_versions(args.root_dir):
+            marker = " (active)" if name == active else " (shadow)" if name == shadowed else ""
+            print(f"{name}{marker}")
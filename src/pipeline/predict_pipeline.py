@@ -1,30 +1,206 @@
 
+import argparse
+import os
 import sys
-import pandas as pd
+import time
+from dataclasses import dataclass
+
 from src.exception import CustomException
-from src.utils import load_object
-import os
+from src.logger import logging
+from src.metrics import METRICS
+from src.pipeline.model_registry import get_serving_loader
+from src.pipeline.prediction_cache import canonical_row_keys
+from src.schema import validate_custom_data_schema
+from src.utils import TableWriter, iter_table_chunks
+
+def _timed_step(step):
+    return METRICS.time(
+        "predict_step_seconds", help="Latency of the load, transform and predict steps of serving", step=step
+    )
+
 
 class PredictPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, loader=None, cache=None):
+        # Model and preprocessor are shared across instances and loaded once per process, from
+        # the model registry's active version when one is published, else from artifacts/
+        self.loader = loader or get_serving_loader()
+        # Optional PredictionCache; repeated rows skip preprocessing and the model entirely
+        self.cache = cache
 
     def predict(self, features):
         try:
-            model_path = os.path.join("artifacts", "model.pkl")
-            preprocessor_path = os.path.join("artifacts", "preprocessor.pkl")
-            print("Before Loading")
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
-            print("After Loading")
+            if self.cache is not None:
+                import numpy as np
+
+                return self._shadow(features, np.asarray(self._cached("predict", features, self._predict)))
+            with _timed_step("load"):
+                model, preprocessor = self.loader.get()
+            return self._shadow(features, self._predict(model, preprocessor, features))
+        
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict_proba(self, features):
+        try:
+            with _timed_step("load"):
+                model, preprocessor = self.loader.get()
+            with _timed_step("transform"):
+                data_scaled = preprocessor.transform(features)
+            with _timed_step("predict"):
+                return model.predict_proba(data_scaled)[:, 1]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def score(self, features):
+        '''
+        Returns (predictions, approval probabilities) from a single transform pass.
+        Probabilities are None when the model has no predict_proba.
+        '''
+        try:
+            if self.cache is not None:
+                import numpy as np
+
+                results = self._cached("score", features, self._score_rows)
+                preds = np.asarray([pred for pred, _ in results])
+                proba = None if not results or results[0][1] is None else np.asarray([p for _, p in results])
+                return self._shadow(features, preds), proba
+            with _timed_step("load"):
+                model, preprocessor = self.loader.get()
+            preds, proba = self._score(model, preprocessor, features)
+            return self._shadow(features, preds), proba
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _shadow(self, features, preds):
+        # A model registry scores the same rows with its shadow version in the background
+        submit_shadow = getattr(self.loader, "submit_shadow", None)
+        if submit_shadow is not None:
+            submit_shadow(features, preds)
+        return preds
+
+    @staticmethod
+    def _predict(model, preprocessor, features):
+        with _timed_step("transform"):
+            data_scaled = preprocessor.transform(features)
+        with _timed_step("predict"):
+            return model.predict(data_scaled)
+
+    @staticmethod
+    def _score(model, preprocessor, features):
+        with _timed_step("transform"):
             data_scaled = preprocessor.transform(features)
+        with _timed_step("predict"):
             preds = model.predict(data_scaled)
-            return preds
-        
+            proba = model.predict_proba(data_scaled)[:, 1] if hasattr(model, "predict_proba") else None
+        return preds, proba
+
+    @classmethod
+    def _score_rows(cls, model, preprocessor, features):
+        preds, proba = cls._score(model, preprocessor, features)
+        if proba is None:
+            return [(pred.item(), None) for pred in preds]
+        return [(pred.item(), p.item()) for pred, p in zip(preds, proba)]
+
+    def _cached(self, kind, features, compute):
+        '''
+        Returns per-row results of compute(model, preprocessor, rows), running it only for
+        rows not already cached for the current model version.
+        '''
+        with _timed_step("load"):
+            model, preprocessor, version = self.loader.get_versioned()
+        self.cache.ensure_version(version)
+
+        keys = canonical_row_keys(features, version, kind)
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = compute(model, preprocessor, features.iloc[missing])
+            for i, result in zip(missing, computed):
+                result = result.item() if hasattr(result, "item") else result
+                results[i] = result
+                self.cache.put(keys[i], result)
+        return results
+
+@dataclass
+class BatchPredictConfig:
+    chunk_size: int = 100_000
+    target_column: str = "LoanApproved"
+    prediction_column: str = "PredictedLoanApproved"
+    probability_column: str = "ApprovalProbability"
+    # Write only the scores instead of echoing the input columns back
+    predictions_only: bool = False
+
+
+class BatchPredictPipeline:
+    def __init__(self, config=None, predict_pipeline=None):
+        self.config = config or BatchPredictConfig()
+        self.predict_pipeline = predict_pipeline or PredictPipeline()
+
+    def score_chunk(self, chunk):
+        features = chunk.drop(columns=[self.config.target_column], errors="ignore")
+        preds, proba = self.predict_pipeline.score(features)
+
+        scored = chunk.iloc[:, :0].copy() if self.config.predictions_only else chunk
+        scored[self.config.prediction_column] = preds
+        if proba is not None:
+            scored[self.config.probability_column] = proba
+        return scored
+
+    def run(self, input_path, output_path, progress=None):
+        '''
+        Scores input_path chunk by chunk into output_path and returns a summary dict.
+        progress, if given, is called with (rows scored, chunks scored) after every chunk.
+        '''
+        try:
+            logging.info(f"Batch scoring {input_path} -> {output_path}")
+            output_dir = os.path.dirname(output_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+            rows = 0
+            chunks = 0
+            start = time.perf_counter()
+            with TableWriter(output_path) as writer:
+                for chunk in iter_table_chunks(input_path, self.config.chunk_size):
+                    writer.write(self.score_chunk(chunk))
+                    rows += len(chunk)
+                    chunks += 1
+                    if progress is not None:
+                        progress(rows, chunks)
+            elapsed = time.perf_counter() - start
+
+            summary = {
+                "rows": rows,
+                "chunks": chunks,
+                "seconds": elapsed,
+                "rows_per_sec": rows / elapsed if elapsed > 0 else float("inf"),
+            }
+            logging.info(f"Batch scoring completed: {summary}")
+            return summary
+
         except Exception as e:
             raise CustomException(e, sys)
 
 class CustomData:
+    # One fixed set of fields; slots keep each applicant to a single compact object
+    __slots__ = (
+        "CreditScore", "AnnualIncome", "LoanAmount", "LoanDuration", "Age", "EmploymentStatus",
+        "MaritalStatus", "NumberOfDependents", "EducationLevel", "HomeOwnershipStatus",
+        "MonthlyDebtPayments", "CreditCardUtilizationRate", "NumberOfOpenCreditLines",
+        "NumberOfCreditInquiries", "DebtToIncomeRatio", "BankruptcyHistory", "LoanPurpose",
+        "PreviousLoanDefaults", "InterestRate", "PaymentHistory", "SavingsAccountBalance",
+        "CheckingAccountBalance", "InvestmentAccountBalance", "RetirementAccountBalance",
+        "EmergencyFundBalance", "TotalAssets", "TotalLiabilities", "NetWorth",
+        "LengthOfCreditHistory", "MortgageBalance", "RentPayments", "AutoLoanBalance",
+        "PersonalLoanBalance", "StudentLoanBalance", "UtilityBillsPaymentHistory",
+        "HealthInsuranceStatus", "LifeInsuranceStatus", "CarInsuranceStatus", "HomeInsuranceStatus",
+        "OtherInsurancePolicies", "EmployerType", "JobTenure", "MonthlySavings", "AnnualBonuses",
+        "AnnualExpenses", "MonthlyHousingCosts", "MonthlyTransportationCosts", "MonthlyFoodCosts",
+        "MonthlyHealthcareCosts", "MonthlyEntertainmentCosts",
+    )
+
     def __init__(self,
                  CreditScore: int,
                  AnnualIncome: int,
@@ -131,60 +307,130 @@ class CustomData:
 
     def get_data_as_data_frame(self):
         try:
-            custom_data_input_dict = {
-                "CreditScore": [self.CreditScore],
-                "AnnualIncome": [self.AnnualIncome],
-                "LoanAmount": [self.LoanAmount],
-                "LoanDuration": [self.LoanDuration],
-                "Age": [self.Age],
-                "EmploymentStatus": [self.EmploymentStatus],
-                "MaritalStatus": [self.MaritalStatus],
-                "NumberOfDependents": [self.NumberOfDependents],
-                "EducationLevel": [self.EducationLevel],
-                "HomeOwnershipStatus": [self.HomeOwnershipStatus],
-                "MonthlyDebtPayments": [self.MonthlyDebtPayments],
-                "CreditCardUtilizationRate": [self.CreditCardUtilizationRate],
-                "NumberOfOpenCreditLines": [self.NumberOfOpenCreditLines],
-                "NumberOfCreditInquiries": [self.NumberOfCreditInquiries],
-                "DebtToIncomeRatio": [self.DebtToIncomeRatio],
-                "BankruptcyHistory": [self.BankruptcyHistory],
-                "LoanPurpose": [self.LoanPurpose],
-                "PreviousLoanDefaults": [self.PreviousLoanDefaults],
-                "InterestRate": [self.InterestRate],
-                "PaymentHistory": [self.PaymentHistory],
-                "SavingsAccountBalance": [self.SavingsAccountBalance],
-                "CheckingAccountBalance": [self.CheckingAccountBalance],
-                "InvestmentAccountBalance": [self.InvestmentAccountBalance],
-                "RetirementAccountBalance": [self.RetirementAccountBalance],
-                "EmergencyFundBalance": [self.EmergencyFundBalance],
-                "TotalAssets": [self.TotalAssets],
-                "TotalLiabilities": [self.TotalLiabilities],
-                "NetWorth": [self.NetWorth],
-                "LengthOfCreditHistory": [self.LengthOfCreditHistory],
-                "MortgageBalance": [self.MortgageBalance],
-                "RentPayments": [self.RentPayments],
-                "AutoLoanBalance": [self.AutoLoanBalance],
-                "PersonalLoanBalance": [self.PersonalLoanBalance],
-                "StudentLoanBalance": [self.StudentLoanBalance],
-                "UtilityBillsPaymentHistory": [self.UtilityBillsPaymentHistory],
-                "HealthInsuranceStatus": [self.HealthInsuranceStatus],
-                "LifeInsuranceStatus": [self.LifeInsuranceStatus],
-                "CarInsuranceStatus": [self.CarInsuranceStatus],
-                "HomeInsuranceStatus": [self.HomeInsuranceStatus],
-                "OtherInsurancePolicies": [self.OtherInsurancePolicies],
-                "EmployerType": [self.EmployerType],
-                "JobTenure": [self.JobTenure],
-                "MonthlySavings": [self.MonthlySavings],
-                "AnnualBonuses": [self.AnnualBonuses],
-                "AnnualExpenses": [self.AnnualExpenses],
-                "MonthlyHousingCosts": [self.MonthlyHousingCosts],
-                "MonthlyTransportationCosts": [self.MonthlyTransportationCosts],
-                "MonthlyFoodCosts": [self.MonthlyFoodCosts],
-                "MonthlyHealthcareCosts": [self.MonthlyHealthcareCosts],
-                "MonthlyEntertainmentCosts": [self.MonthlyEntertainmentCosts]
-            }
+            custom_data_input_dict = {name: [getattr(self, name)] for name in self.__slots__}
+
+            # Imported here so building the app's UI does not wait on pandas
+            import pandas as pd
 
             return pd.DataFrame(custom_data_input_dict)
 
         except Exception as e:
             raise CustomException(e, sys)
+
+    @staticmethod
+    def from_records(records):
+        return CustomDataBatch.from_records(records)
+
+    @staticmethod
+    def from_dict_of_arrays(arrays):
+        return CustomDataBatch.from_dict_of_arrays(arrays)
+
+
+def _field_array(name, values, annotation):
+    import numpy as np
+
+    if annotation is str:
+        return np.asarray(values, dtype=object)
+    try:
+        if annotation is float:
+            return np.asarray(values, dtype=np.float64)
+        values = np.asarray(values)
+        if values.dtype.kind in "iub":
+            return values.astype(np.int64, copy=False)
+        # Floats or mixed values in an integer field: None becomes NaN, fractions are rejected
+        # rather than truncated, and a column with gaps stays float64 with NaN for them
+        floats = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(floats)
+        invalid = ~missing & (~np.isfinite(floats) | (floats != np.trunc(floats)))
+        if invalid.any():
+            raise ValueError(f"expected an integer, got {floats[invalid][0]!r}")
+        return floats if missing.any() else floats.astype(np.int64)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid value for {name}: {e}")
+
+
+class CustomDataBatch:
+    '''
+    Many applicants stored column-wise: one typed numpy array per CustomData field.
+
+    Build it with from_records (dicts or CustomData objects) or from_dict_of_arrays, and
+    turn it into the scoring DataFrame in one step instead of one frame per applicant.
+    '''
+    __slots__ = ("columns", "n_rows")
+
+    def __init__(self, columns, n_rows):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    def __len__(self):
+        return self.n_rows
+
+    @classmethod
+    def from_records(cls, records):
+        try:
+            records = list(records)
+            use_attributes = bool(records) and isinstance(records[0], CustomData)
+            columns = {}
+            for name in CustomData.__slots__:
+                if use_attributes:
+                    values = [getattr(record, name) for record in records]
+                else:
+                    values = [record[name] for record in records]
+                columns[name] = _field_array(name, values, CUSTOM_DATA_TYPES[name])
+            return cls(columns, len(records))
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def from_dict_of_arrays(cls, arrays):
+        try:
+            missing = [name for name in CustomData.__slots__ if name not in arrays]
+            if missing:
+                raise ValueError(f"Missing fields: {', '.join(missing)}")
+            # Arrays that already have the field's dtype are used as they are, without a copy
+            columns = {
+                name: _field_array(name, arrays[name], CUSTOM_DATA_TYPES[name]) for name in CustomData.__slots__
+            }
+            lengths = {len(column) for column in columns.values()}
+            if len(lengths) > 1:
+                raise ValueError(f"Fields have different lengths: {sorted(lengths)}")
+            return cls(columns, lengths.pop())
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def get_data_as_data_frame(self):
+        try:
+            import pandas as pd
+
+            return pd.DataFrame(self.columns, copy=False)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+# Field name -> int, float or str, read from the CustomData constructor annotations
+CUSTOM_DATA_TYPES = {
+    name: annotation for name, annotation in CustomData.__init__.__annotations__.items() if name != "return"
+}
+
+# Fail at import rather than at scoring time if CustomData and the training schema drift apart
+validate_custom_data_schema(CustomData)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of loan applications in chunks.")
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--chunk-size", type=int, default=BatchPredictConfig.chunk_size)
+    parser.add_argument("--predictions-only", action="store_true")
+    args = parser.parse_args()
+
+    batch_pipeline = BatchPredictPipeline(
+        config=BatchPredictConfig(chunk_size=args.chunk_size, predictions_only=args.predictions_only)
+    )
+    summary = batch_pipeline.run(args.input_path, args.output_path)
+    print(
+        f"Scored {summary['rows']} rows in {summary['seconds']:.2f}s "
+        f"({summary['rows_per_sec']:.0f} rows/sec)"
+    )
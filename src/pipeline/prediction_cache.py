@@ -0,0 +1,133 @@
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class PredictionCacheConfig:
+    max_entries: int = 10_000
+    # Entries older than this many seconds are treated as misses; None keeps them until evicted
+    ttl_seconds: Optional[float] = 300.0
+
+
+def _canonical_value(value):
+    if hasattr(value, "item"):
+        # numpy / pandas scalars
+        value = value.item()
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        # 30, 30.0 and np.int64(30) are the same applicant; NaN is a missing value
+        return None if math.isnan(value) else value
+    return str(value)
+
+
+def _row_key(kind, model_version, columns, values):
+    payload = json.dumps(
+        [kind, model_version, columns, [_canonical_value(value) for value in values]], separators=(",", ":")
+    ).encode()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def canonical_row_key(row, model_version, kind="predict"):
+    '''
+    Stable hash of one applicant row (a column -> value dict) for the given model version.
+
+    Columns are sorted and numbers normalised to float, so the same form gives the same
+    key whatever the column order or numeric dtype it arrived with.
+    '''
+    columns = sorted(map(str, row))
+    by_name = {str(column): value for column, value in row.items()}
+    return _row_key(kind, model_version, columns, [by_name[column] for column in columns])
+
+
+def canonical_row_keys(features, model_version, kind="predict"):
+    '''
+    canonical_row_key for every row of a DataFrame. Rows are read through one object-array
+    conversion; to_dict and per-column access cost more than the prediction they would save.
+    '''
+    names = [str(column) for column in features.columns]
+    order = sorted(range(len(names)), key=names.__getitem__)
+    columns = [names[i] for i in order]
+    rows = features.to_numpy(dtype=object)[:, order].tolist()
+    return [_row_key(kind, model_version, columns, values) for values in rows]
+
+
+class PredictionCache:
+    '''
+    Thread-safe bounded LRU cache of per-row prediction results with an optional TTL.
+
+    The cache remembers the model version it was filled with and empties itself as soon as
+    it is used with a different one, so a swapped artifact never serves stale predictions.
+    '''
+
+    def __init__(self, config=None):
+        self.config = config or PredictionCacheConfig()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ensure_version(self, model_version):
+        '''
+        Clears the cache if it holds results of a model version other than model_version.
+        '''
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            ttl = self.config.ttl_seconds
+            if ttl is not None and time.monotonic() - stored_at > ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.config.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.config.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "model_version": self.model_version,
+            }
@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import parse_qs
+
+from src.exception import CustomException
+from src.logger import log_timing, logging
+from src.metrics import METRICS
+from src.pipeline.predict_pipeline import CustomDataBatch, PredictPipeline
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig
+from src.schema import FEATURE_COLUMNS, FEATURE_DTYPES
+
+# CustomData is checked against the schema when predict_pipeline is imported
+CUSTOM_DATA_FIELDS = list(FEATURE_COLUMNS)
+
+KNOWN_PATHS = ("/predict", "/health", "/metrics")
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class ScoringServiceConfig:
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # A batch is flushed as soon as it reaches max_batch_size or max_wait_ms after its first record
+    max_batch_size: int = 256
+    max_wait_ms: float = 5.0
+    # Requests beyond this many queued records are rejected with 503 instead of piling up latency
+    max_queue_size: int = 10_000
+    max_body_bytes: int = 10 * 1024 * 1024
+    # Listen backlog; too small a value makes bursts of new connections wait on SYN retries
+    backlog: int = 1024
+    # Per-record LRU cache of results so client retries skip scoring; 0 disables it
+    prediction_cache_size: int = 0
+    prediction_cache_ttl_seconds: float = 300.0
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _field_error(field, value):
+    '''
+    Why value cannot be scored as field, or None when it matches the field's schema dtype.
+    Labels of the mapped (ordinal) categories must be ones the mapping knows, since the
+    preprocessor rejects anything else.
+    '''
+    dtype = FEATURE_DTYPES[field]
+    if value is None:
+        return f"{field} is null"
+    if dtype == "category":
+        if not isinstance(value, str):
+            return f"{field} must be a string"
+        from src.components.data_transformation import CATEGORY_MAPPINGS
+
+        mapping = CATEGORY_MAPPINGS.get(field)
+        if mapping is not None and value not in mapping:
+            return f"{field} must be one of: {', '.join(mapping)}"
+        return None
+    # bool is an int subclass, but true/false is not an amount
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return f"{field} must be a number"
+    if not math.isfinite(value):
+        return f"{field} must be finite"
+    if dtype.startswith("int"):
+        if isinstance(value, float) and not value.is_integer():
+            return f"{field} must be an integer"
+        bound = 2 ** (int(dtype[3:]) - 1)
+        if not -bound <= value < bound:
+            return f"{field} is outside the {dtype} range"
+    return None
+
+
+def validate_record(record):
+    '''
+    Checks one applicant record against the schema before it joins a shared batch, so a
+    bad record gets its own 400 instead of failing the other requests in its batch.
+    '''
+    if not isinstance(record, dict):
+        raise RequestError(400, "Each applicant record must be a JSON object")
+    missing = [field for field in CUSTOM_DATA_FIELDS if field not in record]
+    if missing:
+        raise RequestError(400, f"Missing fields: {', '.join(missing)}")
+    errors = [error for error in (_field_error(field, record[field]) for field in CUSTOM_DATA_FIELDS) if error]
+    if errors:
+        raise RequestError(400, f"Invalid fields: {'; '.join(errors)}")
+    return {field: record[field] for field in CUSTOM_DATA_FIELDS}
+
+
+class MicroBatcher:
+    '''
+    Coalesces records from concurrent requests into one vectorized predict call.
+
+    Each submitted record gets a future; a single worker drains the queue into batches
+    bounded by max_batch_size and max_wait_ms and scores them on a worker thread so the
+    event loop keeps accepting requests while the model runs.
+    '''
+
+    def __init__(self, predict_pipeline, config):
+        self.predict_pipeline = predict_pipeline
+        self.config = config
+        self.queue = asyncio.Queue(maxsize=config.max_queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scoring")
+        self._worker = None
+        self.batches_scored = 0
+        self.records_scored = 0
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, records):
+        loop = asyncio.get_running_loop()
+        futures = []
+        for record in records:
+            future = loop.create_future()
+            try:
+                self.queue.put_nowait((record, future))
+            except asyncio.QueueFull:
+                for queued in futures:
+                    queued.cancel()
+                raise RequestError(503, "Scoring queue is full, retry later")
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.config.max_wait_ms / 1000
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # Futures of requests that were rejected mid-submit are already cancelled
+            batch = [(record, future) for record, future in batch if not future.done()]
+            if not batch:
+                continue
+            if not await self._score_batch(batch, fail_futures=len(batch) == 1):
+                # Rescore one record at a time so only the records that cannot be scored fail
+                for item in batch:
+                    await self._score_batch([item], fail_futures=True)
+
+    async def _score_batch(self, batch, fail_futures):
+        '''
+        Scores batch and resolves its futures. Returns False when scoring failed; the futures
+        then carry the exception if fail_futures is set and are left pending otherwise.
+        '''
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            # Inside the try so a record that cannot be converted fails its batch, not the worker
+            features = CustomDataBatch.from_records([record for record, _ in batch]).get_data_as_data_frame()
+            preds, proba = await loop.run_in_executor(
+                self.executor, self.predict_pipeline.score, features
+            )
+            elapsed = time.perf_counter() - start
+            log_timing("score_batch", elapsed, batch_size=len(batch))
+            METRICS.observe("scoring_batch_seconds", elapsed, help="Time to score one micro-batch")
+            METRICS.observe(
+                "scoring_batch_size", len(batch), help="Records per micro-batch", buckets=BATCH_SIZE_BUCKETS
+            )
+        except Exception as e:
+            logging.info(f"Batch of {len(batch)} records failed: {e}")
+            if fail_futures:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            return False
+
+        self.batches_scored += 1
+        self.records_scored += len(batch)
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                result = {"prediction": int(preds[i])}
+                if proba is not None:
+                    result["probability"] = float(proba[i])
+                future.set_result(result)
+        return True
+
+
+class ScoringService:
+    '''
+    Minimal asyncio HTTP/1.1 server exposing the prediction pipeline.
+
+    POST /predict accepts one CustomData-shaped JSON object or a list of them.
+    GET /health reports readiness and batching counters.
+    GET /metrics exposes latency histograms and counters in Prometheus text format
+    (or JSON with ?format=json).
+    '''
+
+    def __init__(self, config=None, predict_pipeline=None):
+        self.config = config or ScoringServiceConfig()
+        if predict_pipeline is None:
+            cache = None
+            if self.config.prediction_cache_size > 0:
+                cache = PredictionCache(PredictionCacheConfig(
+                    max_entries=self.config.prediction_cache_size,
+                    ttl_seconds=self.config.prediction_cache_ttl_seconds,
+                ))
+            predict_pipeline = PredictPipeline(cache=cache)
+        self.predict_pipeline = predict_pipeline
+        self.batcher = None
+        self.server = None
+
+    async def start(self):
+        try:
+            # Load artifacts before accepting traffic so the first request is not a cold load
+            self.predict_pipeline.loader.get()
+            self.batcher = MicroBatcher(self.predict_pipeline, self.config)
+            self.batcher.start()
+            self.server = await asyncio.start_server(
+                self._handle_connection, self.config.host, self.config.port, backlog=self.config.backlog
+            )
+            logging.info(f"Scoring service listening on {self.config.host}:{self.config.port}")
+            return self.server
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > self.config.max_body_bytes:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                path, _, query = path.partition("?")
+                start = time.perf_counter()
+                query_format = parse_qs(query).get("format", [None])[0]
+                status, payload = await self._dispatch(method, path, body, query_format)
+                elapsed = time.perf_counter() - start
+                log_timing("request", elapsed, method=method, path=path, status=status)
+                METRICS.observe(
+                    "http_request_seconds", elapsed, help="Time from parsed request to response",
+                    path=path if path in KNOWN_PATHS else "other", status=status
+                )
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _export_gauges(self):
+        # Point-in-time values are copied into the registry when /metrics is scraped
+        METRICS.set("scoring_queue_depth", self.batcher.queue.qsize(), help="Records waiting for a batch")
+        METRICS.set("scoring_records_total", self.batcher.records_scored, help="Records scored since start")
+        cache = self.predict_pipeline.cache
+        if cache is not None:
+            stats = cache.stats()
+            for key in ("hits", "misses", "evictions", "entries"):
+                METRICS.set(f"prediction_cache_{key}", stats[key], help=f"Prediction cache {key}")
+
+    async def _dispatch(self, method, path, body, query_format=None):
+        try:
+            if path == "/health":
+                health = {
+                    "status": "ok",
+                    "model_version": self.predict_pipeline.loader.version,
+                    "batches_scored": self.batcher.batches_scored,
+                    "records_scored": self.batcher.records_scored,
+                    "queued": self.batcher.queue.qsize(),
+                }
+                if self.predict_pipeline.cache is not None:
+                    health["prediction_cache"] = self.predict_pipeline.cache.stats()
+                if hasattr(self.predict_pipeline.loader, "status"):
+                    health["model_registry"] = self.predict_pipeline.loader.status()
+                return 200, health
+            if path == "/metrics":
+                self._export_gauges()
+                if query_format == "json":
+                    return 200, METRICS.to_dict()
+                return 200, METRICS.to_prometheus()
+            if path != "/predict":
+                raise RequestError(404, f"Unknown path {path}")
+            if method != "POST":
+                raise RequestError(405, "Use POST")
+
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "Body is not valid JSON")
+
+            single = isinstance(data, dict)
+            if not single and not isinstance(data, list):
+                raise RequestError(400, "Body must be a JSON object or a list of objects")
+            records = [validate_record(record) for record in ([data] if single else data)]
+            if not records:
+                raise RequestError(400, "No applicant records given")
+
+            results = await self.batcher.submit(records)
+            return 200, results[0] if single else {"results": results}
+
+        except RequestError as e:
+            return e.status, {"error": e.message}
+        except Exception:
+            # The details (paths, internals) go to the log, not to the client
+            logging.error(f"{method} {path} failed", exc_info=True)
+            return 500, {"error": "Internal server error"}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            # Prometheus text exposition format
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve loan approval predictions over HTTP with micro-batching.")
+    parser.add_argument("--host", default=ScoringServiceConfig.host)
+    parser.add_argument("--port", type=int, default=ScoringServiceConfig.port)
+    parser.add_argument("--max-batch-size", type=int, default=ScoringServiceConfig.max_batch_size)
+    parser.add_argument("--max-wait-ms", type=float, default=ScoringServiceConfig.max_wait_ms)
+    parser.add_argument(
+        "--cache-size", type=int, default=ScoringServiceConfig.prediction_cache_size,
+        help="Cache results of up to this many distinct records (0 disables the cache)"
+    )
+    args = parser.parse_args()
+
+    service = ScoringService(
+        config=ScoringServiceConfig(
+            host=args.host,
+            port=args.port,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms,
+            prediction_cache_size=args.cache_size,
+        )
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
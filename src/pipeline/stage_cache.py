@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from src.artifact_store import file_sha256, manifest_path
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.artifact_loader import file_fingerprint
+
+# Root of the src package; every stage key covers all of its modules
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def source_files(source_dir=SOURCE_DIR):
+    '''
+    Sorted paths of every .py file under source_dir. A stage can reach any of them through
+    imports (schema, artifact store, compilers), so the cache keys hash them all.
+    '''
+    files = []
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names[:] = sorted(name for name in dir_names if name != "__pycache__")
+        files.extend(os.path.join(dir_path, name) for name in sorted(file_names) if name.endswith(".py"))
+    return files
+
+
+def config_fingerprint(config):
+    '''
+    Returns the public settings of a config object as a JSON-friendly dict.
+
+    The component configs mix dataclass fields and plain class attributes, so both the
+    class and the instance namespaces are read.
+    '''
+    values = {}
+    for namespace in (vars(type(config)), vars(config)):
+        for name, value in namespace.items():
+            if name.startswith("_") or callable(value) or isinstance(value, (staticmethod, classmethod, property)):
+                continue
+            values[name] = value
+    return values
+
+
+class StageCache:
+    '''
+    Content-addressed cache of pipeline stage outputs.
+
+    A stage's key hashes its configuration, every module of the src package, the content of its
+    external input files and the keys of the stages it depends on. Outputs are copied into
+    cache_dir/<stage>/<key>/ together with the stage's JSON result, and restored instead of
+    re-running the stage whenever the same key comes up again.
+    '''
+
+    def __init__(self, cache_dir=os.path.join("artifacts", "cache")):
+        self.cache_dir = cache_dir
+        self._hash_index_path = os.path.join(cache_dir, "file_hashes.json")
+        self._hash_index = None
+
+    def file_hash(self, file_path):
+        '''
+        sha256 of a file, memoized on (mtime, size) so unchanged large inputs are hashed once.
+        '''
+        if self._hash_index is None:
+            self._hash_index = {}
+            if os.path.exists(self._hash_index_path):
+                with open(self._hash_index_path) as file_obj:
+                    self._hash_index = json.load(file_obj)
+
+        key = os.path.abspath(file_path)
+        fingerprint = list(file_fingerprint(file_path))
+        entry = self._hash_index.get(key)
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return entry["sha256"]
+
+        digest = file_sha256(file_path)
+        self._hash_index[key] = {"fingerprint": fingerprint, "sha256": digest}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._hash_index_path, "w") as file_obj:
+            json.dump(self._hash_index, file_obj)
+        return digest
+
+    def key(self, stage_name, config=None, inputs=(), upstream=(), code_files=()):
+        try:
+            payload = {
+                "stage": stage_name,
+                "config": config,
+                "inputs": [self.file_hash(path) for path in inputs],
+                "upstream": list(upstream),
+                "code": [self.file_hash(path) for path in code_files],
+            }
+            encoded = json.dumps(payload, sort_keys=True, default=repr).encode()
+            return hashlib.sha256(encoded).hexdigest()[:24]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _entry_dir(self, stage_name, key):
+        return os.path.join(self.cache_dir, stage_name, key)
+
+    def run(self, stage_name, key, outputs, func):
+        '''
+        Returns func()'s result for this key, running it only on a cache miss.
+
+        outputs lists the files the stage writes; func's result must be JSON-serializable.
+        '''
+        try:
+            entry_dir = self._entry_dir(stage_name, key)
+            entry_manifest_path = os.path.join(entry_dir, "manifest.json")
+
+            if os.path.exists(entry_manifest_path):
+                with open(entry_manifest_path) as file_obj:
+                    manifest = json.load(file_obj)
+                if all(os.path.exists(os.path.join(entry_dir, name)) for name in manifest["outputs"].values()):
+                    for output_path, name in manifest["outputs"].items():
+                        self._restore(os.path.join(entry_dir, name), output_path)
+                    logging.info(f"Stage cache hit for {stage_name} ({key}), skipped the stage")
+                    return manifest["result"]
+
+            logging.info(f"Stage cache miss for {stage_name} ({key}), running the stage")
+            result = func()
+            # Artifact manifests travel with their files so restored artifacts still verify
+            outputs = list(outputs) + [
+                manifest_path(path) for path in outputs if os.path.exists(manifest_path(path))
+            ]
+
+            staging_dir = entry_dir + ".tmp"
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            os.makedirs(staging_dir)
+            stored = {}
+            for i, output_path in enumerate(outputs):
+                name = f"{i}_{os.path.basename(output_path)}"
+                shutil.copy2(output_path, os.path.join(staging_dir, name))
+                stored[output_path] = name
+            with open(os.path.join(staging_dir, "manifest.json"), "w") as file_obj:
+                json.dump({"outputs": stored, "result": result}, file_obj)
+
+            # Publish the entry in one rename so an interrupted run never leaves a partial hit
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(staging_dir, entry_dir)
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _restore(self, cached_path, output_path):
+        if os.path.exists(output_path) and file_fingerprint(output_path) == file_fingerprint(cached_path):
+            # copy2 keeps mtimes, so an identical stamp means the file is already in place
+            return
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        tmp_path = output_path + ".tmp"
+        shutil.copy2(cached_path, tmp_path)
+        os.replace(tmp_path, output_path)
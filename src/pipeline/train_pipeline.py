@@ -1,31 +1,177 @@
 
+import argparse
+import json
 import os
 import sys
+from src.utils import table_row_count
 from src.components.data_ingestion import DataIngestion
-from src.components.data_transformation import DataTransformation
-from src.components.model_trainer import ModelTrainer
+from src.components.data_transformation import (
+    DataTransformation, DataTransformationConfig, feature_matrix_paths, load_rebalancing, load_transformed_arrays,
+    rebalance_output_paths
+)
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig, get_candidate_models
 from src.exception import CustomException
+from src.metrics import METRICS, format_stage_report, track_stage
+from src.pipeline.stage_cache import StageCache, config_fingerprint, source_files
 
 class TrainPipeline:
-    def __init__(self):
-        pass
+    def __init__(
+        self, use_cache=False, cache_dir=os.path.join("artifacts", "cache"),
+        metrics_path=os.path.join("artifacts", "train_metrics.json"), transformation_config=None,
+        model_trainer_config=None
+    ):
+        # With use_cache, stages whose inputs, config and code are unchanged are restored from cache
+        self.stage_cache = StageCache(cache_dir) if use_cache else None
+        self.metrics_path = metrics_path
+        self.transformation_config = transformation_config
+        self.model_trainer_config = model_trainer_config
+        self.stage_records = []
+
+    def _run_stage(self, stage_name, key, outputs, func, count_rows=None, workers_peak_rss=None):
+        with track_stage(stage_name, use_cache=self.stage_cache is not None) as record:
+            if self.stage_cache is None:
+                result = func()
+            else:
+                result = self.stage_cache.run(stage_name, key, outputs, func)
+            if count_rows is not None:
+                record.rows = count_rows(result)
+            if workers_peak_rss is not None:
+                record.workers_peak_rss_mb = workers_peak_rss()
+        self.stage_records.append(record)
+        return result
+
+    def report(self):
+        '''
+        Prints the per-stage summary and writes it, with all collected metrics, to metrics_path.
+        '''
+        print(format_stage_report(self.stage_records))
+        if self.metrics_path:
+            metrics_dir = os.path.dirname(self.metrics_path)
+            if metrics_dir:
+                os.makedirs(metrics_dir, exist_ok=True)
+            with open(self.metrics_path, "w") as file_obj:
+                json.dump(
+                    {"stages": [record.to_dict() for record in self.stage_records], "metrics": METRICS.to_dict()},
+                    file_obj, indent=2
+                )
+
+    def _key(self, stage_name, config, inputs=(), upstream=()):
+        if self.stage_cache is None:
+            return None
+        return self.stage_cache.key(stage_name, config, inputs=inputs, upstream=upstream, code_files=source_files())
 
     def run_pipeline(self):
         try:
             obj = DataIngestion()
-            train_data_path, test_data_path = obj.initiate_data_ingestion()
+            ingestion_config = obj.ingestion_config
+            ingestion_outputs = [ingestion_config.train_data_path, ingestion_config.test_data_path]
+            if ingestion_config.save_raw_copy:
+                ingestion_outputs.append(ingestion_config.raw_data_path)
+            ingestion_key = self._key(
+                "data_ingestion", config_fingerprint(ingestion_config),
+                inputs=[ingestion_config.source_data_path]
+            )
+            train_data_path, test_data_path = self._run_stage(
+                "data_ingestion", ingestion_key, ingestion_outputs,
+                lambda: list(obj.initiate_data_ingestion()),
+                count_rows=lambda paths: sum(table_row_count(path) for path in paths)
+            )
+
+            data_transformation = DataTransformation(self.transformation_config)
+            transformation_config = data_transformation.data_transformation_config
+            transformation_key = self._key(
+                "data_transformation", config_fingerprint(transformation_config),
+                upstream=[ingestion_key]
+            )
+            self._run_stage(
+                "data_transformation", transformation_key,
+                [
+                    transformation_config.preprocessor_obj_file_path,
+                    *feature_matrix_paths(transformation_config),
+                    transformation_config.y_train_file_path,
+                    transformation_config.y_test_file_path,
+                    *rebalance_output_paths(transformation_config),
+                ],
+                lambda: data_transformation.initiate_data_transformation(train_data_path, test_data_path)[-1],
+                count_rows=lambda _: sum(
+                    array.shape[0] for array in load_transformed_arrays(transformation_config)[::2]
+                )
+            )
+            X_train, y_train, X_test, y_test = load_transformed_arrays(transformation_config)
+            train_index, sample_weight = load_rebalancing(transformation_config)
 
-            data_transformation = DataTransformation()
-            train_arr, test_arr, _ = data_transformation.initiate_data_transformation(train_data_path, test_data_path)
+            model_trainer = ModelTrainer(self.model_trainer_config)
+            candidates = {
+                name: repr(model)
+                for name, model in get_candidate_models(
+                    model_trainer.model_trainer_config.incremental_capable_only, transformation_config.sparse_output
+                ).items()
+            }
+            training_key = self._key(
+                "model_trainer",
+                {"config": config_fingerprint(model_trainer.model_trainer_config), "models": candidates},
+                upstream=[transformation_key]
+            )
+            accuracy = self._run_stage(
+                "model_trainer", training_key, [model_trainer.model_trainer_config.trained_model_file_path],
+                lambda: float(model_trainer.initiate_model_trainer(
+                    X_train, y_train, X_test, y_test, train_index=train_index, sample_weight=sample_weight
+                )),
+                count_rows=lambda _: X_train.shape[0] if train_index is None else len(train_index),
+                # None on a cache hit, when no worker ran
+                workers_peak_rss=lambda: model_trainer.workers_peak_rss_mb
+            )
 
-            model_trainer = ModelTrainer()
-            accuracy = model_trainer.initiate_model_trainer(train_arr, test_arr)
-            
             print(f"Training completed. Model Accuracy: {accuracy}")
-            
+            self.report()
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def run_incremental_pipeline(self, new_data_path):
+        '''
+        Updates the current preprocessor and model from new_data_path only, without
+        re-running ingestion or training over the full history.
+        '''
+        try:
+            ingestion_config = DataIngestion().ingestion_config
+            transformation_config = DataTransformation(self.transformation_config).data_transformation_config
+
+            model_trainer = ModelTrainer(self.model_trainer_config)
+            with track_stage("incremental_training") as record:
+                accuracy = model_trainer.initiate_incremental_training(
+                    new_data_path,
+                    preprocessor_path=transformation_config.preprocessor_obj_file_path,
+                    test_data_path=ingestion_config.test_data_path,
+                )
+                record.rows = table_row_count(new_data_path)
+            self.stage_records.append(record)
+
+            print(f"Incremental training completed. Model Accuracy: {accuracy}")
+            self.report()
+
         except Exception as e:
             raise CustomException(e, sys)
 
 if __name__ == "__main__":
-    pipeline = TrainPipeline()
-    pipeline.run_pipeline()
+    parser = argparse.ArgumentParser(description="Run ingestion, transformation and training.")
+    parser.add_argument("--cache", action="store_true", help="Skip stages whose inputs and config are unchanged")
+    parser.add_argument("--incremental", metavar="NEW_DATA_PATH", help="Update the current model from a new labeled batch only")
+    parser.add_argument("--sparse", action="store_true", help="Keep one-hot features sparse and scale numeric columns only")
+    parser.add_argument(
+        "--incremental-capable-only", action="store_true",
+        help="Only consider models that --incremental can update later (partial_fit or warm_start)"
+    )
+    args = parser.parse_args()
+
+    transformation_config = DataTransformationConfig()
+    transformation_config.sparse_output = args.sparse
+    model_trainer_config = ModelTrainerConfig()
+    model_trainer_config.incremental_capable_only = args.incremental_capable_only
+    pipeline = TrainPipeline(
+        use_cache=args.cache, transformation_config=transformation_config, model_trainer_config=model_trainer_config
+    )
+    if args.incremental:
+        pipeline.run_incremental_pipeline(args.incremental)
+    else:
+        pipeline.run_pipeline()
@@ -0,0 +1,116 @@
+import sys
+
+from src.exception import CustomException
+
+TARGET_COLUMN = "LoanApproved"
+
+# Declared dtypes of the applicant fields, in CustomData constructor order. Scores, ages,
+# durations and counts are int32; money amounts and balances are int64, since real
+# incomes and asset totals can pass the int32 limit of about 2.1 billion. Rates need no
+# more than float32 precision, and string fields are pandas categories so each distinct
+# label is stored once instead of once per row. Integer casts check the range (see
+# src.utils.cast_columns) rather than wrapping.
+FEATURE_DTYPES = {
+    "CreditScore": "int32",
+    "AnnualIncome": "int64",
+    "LoanAmount": "int64",
+    "LoanDuration": "int32",
+    "Age": "int32",
+    "EmploymentStatus": "category",
+    "MaritalStatus": "category",
+    "NumberOfDependents": "int32",
+    "EducationLevel": "category",
+    "HomeOwnershipStatus": "category",
+    "MonthlyDebtPayments": "int64",
+    "CreditCardUtilizationRate": "float32",
+    "NumberOfOpenCreditLines": "int32",
+    "NumberOfCreditInquiries": "int32",
+    "DebtToIncomeRatio": "float32",
+    "BankruptcyHistory": "int32",
+    "LoanPurpose": "category",
+    "PreviousLoanDefaults": "int32",
+    "InterestRate": "float32",
+    "PaymentHistory": "int32",
+    "SavingsAccountBalance": "int64",
+    "CheckingAccountBalance": "int64",
+    "InvestmentAccountBalance": "int64",
+    "RetirementAccountBalance": "int64",
+    "EmergencyFundBalance": "int64",
+    "TotalAssets": "int64",
+    "TotalLiabilities": "int64",
+    "NetWorth": "int64",
+    "LengthOfCreditHistory": "int32",
+    "MortgageBalance": "int64",
+    "RentPayments": "int64",
+    "AutoLoanBalance": "int64",
+    "PersonalLoanBalance": "int64",
+    "StudentLoanBalance": "int64",
+    "UtilityBillsPaymentHistory": "float32",
+    "HealthInsuranceStatus": "category",
+    "LifeInsuranceStatus": "category",
+    "CarInsuranceStatus": "category",
+    "HomeInsuranceStatus": "category",
+    "OtherInsurancePolicies": "int32",
+    "EmployerType": "category",
+    "JobTenure": "int32",
+    "MonthlySavings": "int64",
+    "AnnualBonuses": "int64",
+    "AnnualExpenses": "int64",
+    "MonthlyHousingCosts": "int64",
+    "MonthlyTransportationCosts": "int64",
+    "MonthlyFoodCosts": "int64",
+    "MonthlyHealthcareCosts": "int64",
+    "MonthlyEntertainmentCosts": "int64",
+}
+COLUMN_DTYPES = {**FEATURE_DTYPES, TARGET_COLUMN: "int8"}
+
+FEATURE_COLUMNS = list(FEATURE_DTYPES)
+
+# Python type each declared dtype corresponds to in the CustomData constructor
+_PYTHON_TYPES = {"int32": int, "int64": int, "float32": float, "category": str}
+
+
+def column_dtypes(columns=None):
+    '''
+    Declared dtypes for the given columns (all schema columns when None); columns
+    the schema does not know are left out, so pandas infers them as before.
+    '''
+    if columns is None:
+        return dict(COLUMN_DTYPES)
+    return {column: COLUMN_DTYPES[column] for column in columns if column in COLUMN_DTYPES}
+
+
+def apply_schema(df):
+    '''
+    Casts the schema columns of df to their declared dtypes. Already matching columns are not
+    copied, and a value outside an integer column's range raises instead of wrapping.
+    '''
+    from src.utils import cast_columns
+
+    try:
+        return cast_columns(df, column_dtypes(df.columns))
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def validate_custom_data_schema(custom_data_cls):
+    '''
+    Checks that the CustomData constructor takes exactly the schema's feature columns, in
+    order, with matching int/float/str annotations. Raises ValueError on any difference.
+    '''
+    annotations = {
+        name: annotation for name, annotation in custom_data_cls.__init__.__annotations__.items() if name != "return"
+    }
+    if list(annotations) != FEATURE_COLUMNS:
+        missing = sorted(set(FEATURE_COLUMNS) - set(annotations))
+        extra = sorted(set(annotations) - set(FEATURE_COLUMNS))
+        raise ValueError(
+            f"{custom_data_cls.__name__} fields differ from the schema: missing {missing}, extra {extra}"
+            if missing or extra else f"{custom_data_cls.__name__} fields are not in schema order"
+        )
+    mismatched = [
+        name for name, annotation in annotations.items() if _PYTHON_TYPES[FEATURE_DTYPES[name]] is not annotation
+    ]
+    if mismatched:
+        raise ValueError(f"{custom_data_cls.__name__} field types differ from the schema: {mismatched}")
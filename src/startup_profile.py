@@ -0,0 +1,76 @@
+import argparse
+import json
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "src.pipeline.predict_pipeline",
+    "src.pipeline.scoring_service",
+    "src.pipeline.train_pipeline",
+]
+
+
+def measure_import_times(module):
+    '''
+    Imports module in a fresh interpreter with -X importtime and returns
+    {imported module: (self_us, cumulative_us)} plus the total for module itself.
+    '''
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings, timings.get(module, (0, 0))[1]
+
+
+def build_report(modules, top):
+    report = {}
+    for module in modules:
+        timings, total_us = measure_import_times(module)
+        slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        report[module] = {
+            "total_ms": total_us / 1000,
+            "modules_imported": len(timings),
+            "slowest": [
+                {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+                for name, (self_us, cumulative_us) in slowest
+            ],
+            "src_modules": {
+                name: self_us / 1000 for name, (self_us, _) in timings.items() if name.startswith("src")
+            },
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report per-module import time of the project's entry points.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list per entry point")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    parser.add_argument("--budget-ms", type=float, help="Exit non-zero if any entry point imports slower than this")
+    args = parser.parse_args()
+
+    report = build_report(args.modules, args.top)
+    for module, entry in report.items():
+        print(f"{module}: {entry['total_ms']:.1f} ms, {entry['modules_imported']} modules")
+        for slow in entry["slowest"]:
+            print(f"    {slow['cumulative_ms']:9.1f} ms  {slow['module']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
+
+    if args.budget_ms is not None:
+        over_budget = [module for module, entry in report.items() if entry["total_ms"] > args.budget_ms]
+        if over_budget:
+            print(f"Over the {args.budget_ms} ms import budget: {', '.join(over_budget)}")
+            sys.exit(1)
@@ -1,48 +1,360 @@
+import mmap
+import multiprocessing
 import os
 import sys
-import numpy as np 
-import pandas as pd
-import dill
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import tempfile
+import time
 from src.exception import CustomException
+from src.logger import logging
 
-def save_object(file_path, obj):
+# numpy, pandas, dill and sklearn are imported inside the functions that use them, so
+# importing src.utils (and everything that depends on it) stays cheap at startup.
+
+def save_object(file_path, obj, metadata=None):
+    '''
+    Pickles obj with dill through the artifact store: the file is written atomically and
+    a manifest with its sha256, schema and library versions is written next to it.
+    '''
+    from src.artifact_store import save_pickle
+
+    return save_pickle(file_path, obj, metadata=metadata)
+
+def load_object(file_path, verify=True):
+    from src.artifact_store import load_pickle
+
+    return load_pickle(file_path, verify=verify)
+
+TABLE_FORMATS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+def table_format_from_path(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    for file_format, format_extension in TABLE_FORMATS.items():
+        if extension == format_extension:
+            return file_format
+    raise ValueError(f"Unsupported table format for {file_path}, expected one of {list(TABLE_FORMATS.values())}")
+
+def save_table(df, file_path):
+    '''
+    Writes df as CSV, Parquet or Feather depending on the file extension.
+    Parquet and Feather keep column dtypes, CSV does not.
+    '''
     try:
         dir_path = os.path.dirname(file_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
 
-        os.makedirs(dir_path, exist_ok=True)
-
-        with open(file_path, "wb") as file_obj:
-            dill.dump(obj, file_obj)
+        file_format = table_format_from_path(file_path)
+        if file_format == "parquet":
+            df.to_parquet(file_path, index=False)
+        elif file_format == "feather":
+            df.reset_index(drop=True).to_feather(file_path)
+        else:
+            df.to_csv(file_path, index=False, header=True)
 
     except Exception as e:
         raise CustomException(e, sys)
 
-def load_object(file_path):
+def _integer_dtype(dtype):
+    import numpy as np
+
     try:
-        with open(file_path, "rb") as file_obj:
-            return dill.load(file_obj)
+        dtype = np.dtype(dtype)
+    except TypeError:
+        # pandas-only dtypes such as "category"
+        return None
+    return dtype if dtype.kind in "iu" else None
+
+def _check_integer_range(series, column, dtype):
+    target = _integer_dtype(dtype)
+    if target is None or series.dtype.kind not in "iuf" or not len(series):
+        return
+    import numpy as np
+
+    low, high = series.min(), series.max()
+    info = np.iinfo(target)
+    if (low == low and low < info.min) or (high == high and high > info.max):
+        raise ValueError(f"{column} has values in [{low}, {high}], outside the {target} range")
+
+def cast_columns(df, dtype):
+    '''
+    df.astype(dtype) that raises instead of silently wrapping when a value does not fit an
+    integer dtype. A mapping may name columns df does not have, as read_csv allows; columns
+    that already have the requested dtype are left alone instead of being copied.
+    '''
+    if dtype is None:
+        return df
+    if isinstance(dtype, dict):
+        dtype = {
+            column: column_dtype for column, column_dtype in dtype.items()
+            if column in df.columns and str(df[column].dtype) != str(column_dtype)
+        }
+        for column, column_dtype in dtype.items():
+            _check_integer_range(df[column], column, column_dtype)
+    else:
+        for column in df.columns:
+            _check_integer_range(df[column], column, dtype)
+    return df.astype(dtype) if dtype else df
+
+def _csv_dtype(dtype):
+    # read_csv wraps integers that overflow the requested dtype, so integer columns are
+    # parsed as int64 and narrowed by cast_columns, which checks the range
+    if dtype is None:
+        return None
+    if isinstance(dtype, dict):
+        return {column: column_dtype for column, column_dtype in dtype.items() if _integer_dtype(column_dtype) is None}
+    return None if _integer_dtype(dtype) is not None else dtype
+
+def load_table(file_path, columns=None, dtype=None):
+    try:
+        import pandas as pd
+
+        file_format = table_format_from_path(file_path)
+        if file_format == "parquet":
+            df = pd.read_parquet(file_path, columns=columns)
+        elif file_format == "feather":
+            df = pd.read_feather(file_path, columns=columns)
+        else:
+            df = pd.read_csv(file_path, usecols=columns, dtype=_csv_dtype(dtype))
+        return cast_columns(df, dtype)
 
     except Exception as e:
         raise CustomException(e, sys)
 
-def evaluate_models(X_train, y_train, X_test, y_test, models):
-    try:
-        report = {}
+def table_row_count(file_path):
+    '''
+    Number of data rows in a table file, read from Parquet/Feather metadata without loading the data.
+    '''
+    file_format = table_format_from_path(file_path)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(file_path).metadata.num_rows
+    if file_format == "feather":
+        import pyarrow as pa
+
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    newlines = 0
+    with open(file_path, "rb") as file_obj:
+        for block in iter(lambda: file_obj.read(1 << 20), b""):
+            newlines += block.count(b"\n")
+    # Minus the header line
+    return max(newlines - 1, 0)
+
+def iter_table_chunks(file_path, chunk_size, dtype=None):
+    '''
+    Yields DataFrames of at most chunk_size rows without reading the whole file.
+    '''
+    file_format = table_format_from_path(file_path)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+            df = batch.to_pandas()
+            yield cast_columns(df, dtype)
+    elif file_format == "feather":
+        import pyarrow as pa
+
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                for offset in range(0, batch.num_rows, chunk_size):
+                    df = batch.slice(offset, chunk_size).to_pandas()
+                    yield cast_columns(df, dtype)
+    else:
+        import pandas as pd
+
+        for df in pd.read_csv(file_path, chunksize=chunk_size, dtype=_csv_dtype(dtype)):
+            yield cast_columns(df, dtype)
+
+class TableWriter:
+    '''
+    Appends DataFrame chunks to a CSV, Parquet or Feather file so nothing accumulates in memory.
+    The first chunk fixes the Arrow schema; later chunks are cast to it. Each chunk infers
+    its own categories, but a Feather file holds one dictionary per column, so the
+    categories of every chunk are extended to the union seen so far; a grown dictionary
+    is then written as a delta instead of a replacement the file format rejects.
+    '''
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_format = table_format_from_path(file_path)
+        self._writer = None
+        self._schema = None
+        self._categories = {}
+        self._wrote_header = False
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para = {} # No hyperparameters tuning for this task
+    def _align_categories(self, df):
+        import pandas as pd
 
-            model.fit(X_train, y_train)
+        aligned = {}
+        for column in df.columns:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                continue
+            known = self._categories.setdefault(column, [])
+            seen = set(known)
+            known.extend(label for label in df[column].cat.categories if label not in seen)
+            if list(df[column].cat.categories) != known:
+                aligned[column] = df[column].cat.set_categories(known)
+        return df.assign(**aligned) if aligned else df
+
+    def write(self, df):
+        try:
+            if self.file_format == "csv":
+                df.to_csv(
+                    self.file_path,
+                    mode="a" if self._wrote_header else "w",
+                    header=not self._wrote_header,
+                    index=False,
+                )
+                self._wrote_header = True
+                return
+
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(self._align_categories(df), schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.file_format == "parquet":
+                    import pyarrow.parquet as pq
+
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                else:
+                    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema, options=options)
+            self._writer.write_table(table)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _shareable_array(array, tmp_dir):
+    '''
+    Returns a (filename, dtype, shape, offset, order) reference workers can memory-map.
+    Arrays that already are whole-file memmaps are referenced as they are; anything else
+    is written once to tmp_dir. Sparse matrices become ("csr", shape, data, indices, indptr)
+    with a reference for each of their arrays.
+    '''
+    import numpy as np
+
+    if hasattr(array, "tocsr"):
+        csr = array.tocsr()
+        return ("csr", csr.shape) + tuple(_shareable_array(part, tmp_dir) for part in (csr.data, csr.indices, csr.indptr))
+
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap):
+        order = "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+        return (array.filename, array.dtype.str, array.shape, array.offset, order)
+
+    file_path = os.path.join(tmp_dir, f"{len(os.listdir(tmp_dir))}.npy")
+    np.save(file_path, np.ascontiguousarray(array))
+    shared = np.load(file_path, mmap_mode="r")
+    return (file_path, shared.dtype.str, shared.shape, shared.offset, "C")
+
+def _open_shared_array(reference):
+    import numpy as np
+
+    if reference[0] == "csr":
+        import scipy.sparse as sp
+
+        return sp.csr_matrix(tuple(_open_shared_array(part) for part in reference[2:]), shape=reference[1])
+
+    file_path, dtype, shape, offset, order = reference
+    return np.memmap(file_path, dtype=np.dtype(dtype), mode="r", shape=shape, offset=offset, order=order)
+
+def _fit_and_score(name, model, X_train_ref, y_train_ref, X_test_ref, y_test_ref, train_index_ref=None,
+                   sample_weight_ref=None, in_worker=False):
+    import numpy as np
+    from sklearn.metrics import accuracy_score
+    from sklearn.utils.validation import has_fit_parameter
+
+    from src.metrics import peak_rss_mb
+
+    X_train, y_train, X_test, y_test = (
+        _open_shared_array(ref) for ref in (X_train_ref, y_train_ref, X_test_ref, y_test_ref)
+    )
+    start = time.perf_counter()
+    sample_weight = None if sample_weight_ref is None else _open_shared_array(sample_weight_ref)
+    if train_index_ref is not None:
+        train_index = _open_shared_array(train_index_ref)
+        if has_fit_parameter(model, "sample_weight"):
+            # A row drawn k times weighs k, so the shared matrix is fitted on as it is
+            counts = np.bincount(train_index, minlength=len(y_train)).astype(np.float64)
+            sample_weight = counts if sample_weight is None else counts * sample_weight
+        else:
+            # Only models without sample_weight gather the rebalanced rows, in the worker, for the fit
+            X_train, y_train = X_train[train_index], y_train[train_index]
+            if sample_weight is not None:
+                sample_weight = sample_weight[train_index]
+    fit_params = {} if sample_weight is None else {"sample_weight": sample_weight}
+    model.fit(X_train, y_train, **fit_params)
+    fit_seconds = time.perf_counter() - start
+
+    y_test_pred = model.predict(X_test)
+    test_model_score = accuracy_score(y_test, y_test_pred)
+
+    return name, model, {
+        "score": test_model_score,
+        "fit_seconds": fit_seconds,
+        "wall_seconds": time.perf_counter() - start,
+        "peak_rss_mb": peak_rss_mb(),
+        "in_worker": in_worker,
+    }
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, n_jobs=None, train_index=None, sample_weight=None):
+    '''
+    Fits every model in models and scores it on the test set.
+
+    train_index selects (and may repeat) the training rows each model is fitted on. Models
+    whose fit takes sample_weight get each row's count in train_index as its weight instead,
+    so the matrix is never gathered; the others are fitted on the gathered rows.
+    sample_weight is passed on to fit.
+
+    With n_jobs > 1 each model runs in its own worker process; the matrices are shared
+    with the workers through memory-mapped files instead of being pickled to each one.
+    The fitted estimators replace the entries in models. Returns
+    {name: {"score", "fit_seconds", "wall_seconds", "peak_rss_mb", "in_worker"}}; peak_rss_mb
+    is the worker's peak RSS, or the whole process's when n_jobs == 1 (in_worker False).
+    '''
+    try:
+        report = {}
+        n_jobs = n_jobs or min(len(models), os.cpu_count() or 1)
 
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
+        with tempfile.TemporaryDirectory(prefix="evaluate_models_") as tmp_dir:
+            references = [
+                _shareable_array(array, tmp_dir) for array in (X_train, y_train, X_test, y_test)
+            ] + [
+                None if array is None else _shareable_array(array, tmp_dir) for array in (train_index, sample_weight)
+            ]
+            tasks = [(name, model, *references, n_jobs > 1) for name, model in models.items()]
 
-            train_model_score = accuracy_score(y_train, y_train_pred)
-            test_model_score = accuracy_score(y_test, y_test_pred)
+            if n_jobs == 1:
+                results = [_fit_and_score(*task) for task in tasks]
+            else:
+                # One task per child so each model's peak memory is measured on its own
+                with multiprocessing.Pool(processes=min(n_jobs, len(tasks)), maxtasksperchild=1) as pool:
+                    results = pool.starmap(_fit_and_score, tasks)
 
-            report[list(models.keys())[i]] = test_model_score
+        for name, fitted_model, model_report in results:
+            models[name] = fitted_model
+            report[name] = model_report
+            logging.info(f"Evaluated {name}: {model_report}")
 
         return report
 
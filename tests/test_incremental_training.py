@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import SGDClassifier
+
+from src.artifact_store import read_manifest
+from src.components.data_transformation import DataTransformation
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+from src.data_generator import generate_chunk
+from src.schema import FEATURE_COLUMNS, TARGET_COLUMN, apply_schema
+from src.utils import load_object, save_object, save_table
+
+pytestmark = pytest.mark.filterwarnings("ignore:Found unknown categories")
+
+
+def test_incremental_training_reverifies_compiled_preprocessor(tmp_path):
+    train_df = apply_schema(generate_chunk(500, 0))
+    preprocessor = DataTransformation().get_data_transformer_object()
+    X_train = preprocessor.fit_transform(train_df[FEATURE_COLUMNS])
+    model = SGDClassifier(loss="log_loss", random_state=42).fit(X_train, train_df[TARGET_COLUMN])
+
+    config = ModelTrainerConfig()
+    config.trained_model_file_path = str(tmp_path / "model.pkl")
+    preprocessor_path = str(tmp_path / "preprocessor.pkl")
+    save_object(file_path=config.trained_model_file_path, obj=model)
+    save_object(file_path=preprocessor_path, obj=preprocessor, metadata={"compiled_preprocessor_verified": True})
+
+    new_data_path, test_data_path = str(tmp_path / "new.parquet"), str(tmp_path / "test.parquet")
+    save_table(generate_chunk(300, 1), new_data_path)
+    save_table(generate_chunk(200, 2), test_data_path)
+
+    ModelTrainer(config).initiate_incremental_training(new_data_path, preprocessor_path, test_data_path)
+
+    updated = load_object(preprocessor_path)
+    # The scaler folded in the new rows, and the manifest still says the compiled path was checked
+    assert np.max(updated[-1].n_samples_seen_) == 800
+    assert read_manifest(preprocessor_path)["metadata"]["compiled_preprocessor_verified"] is True
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.components.data_transformation import DataTransformation
+from src.components.preprocessor_compiler import compile_preprocessor
+from src.data_generator import generate_chunk
+from src.schema import FEATURE_COLUMNS, apply_schema
+
+pytestmark = pytest.mark.filterwarnings("ignore:Found unknown categories")
+
+# One-hot encoded columns; the test frame gets labels for them the fit never saw
+ONE_HOT_COLUMNS = ["LoanPurpose", "HomeOwnershipStatus", "EmploymentStatus", "MaritalStatus", "EmployerType"]
+
+
+def _features(n_rows, seed, schema):
+    df = generate_chunk(n_rows, seed)[FEATURE_COLUMNS]
+    return apply_schema(df) if schema else df.astype({column: object for column in ONE_HOT_COLUMNS})
+
+
+def _with_unseen_categories(df):
+    df = df.astype({column: object for column in ONE_HOT_COLUMNS})
+    for i, column in enumerate(ONE_HOT_COLUMNS):
+        df.iloc[i::7, df.columns.get_loc(column)] = f"Unseen{column}"
+    return df
+
+
+@pytest.mark.parametrize("schema", [True, False], ids=["schema_dtypes", "object_dtypes"])
+def test_compiled_preprocessor_matches_sklearn_bit_for_bit(schema):
+    pipeline = DataTransformation().get_data_transformer_object()
+    pipeline.fit(_features(500, seed=0, schema=schema))
+    compiled = compile_preprocessor(pipeline)
+
+    test_df = _with_unseen_categories(_features(200, seed=1, schema=schema))
+    expected = pipeline.transform(test_df)
+    actual = compiled.transform(test_df)
+
+    assert actual.dtype == expected.dtype
+    assert np.array_equal(actual, expected)
+    # Bit-for-bit, so -0.0 and 0.0 or differently rounded values would also fail
+    assert np.array_equal(actual.view(np.uint64), expected.view(np.uint64))
+
+
+def test_compiled_preprocessor_single_record_matches_sklearn():
+    pipeline = DataTransformation().get_data_transformer_object()
+    pipeline.fit(_features(500, seed=0, schema=True))
+    compiled = compile_preprocessor(pipeline)
+
+    test_df = _with_unseen_categories(_features(20, seed=2, schema=False))
+    for i in range(len(test_df)):
+        row = test_df.iloc[i:i + 1]
+        expected = pipeline.transform(row).view(np.uint64)
+        assert np.array_equal(compiled.transform(row).view(np.uint64), expected)
+        assert np.array_equal(compiled.transform_record(row.iloc[0].to_dict()).view(np.uint64), expected)
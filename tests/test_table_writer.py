@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from src.data_generator import generate_chunk
+from src.schema import apply_schema
+from src.utils import TableWriter, load_table
+
+
+@pytest.mark.parametrize("extension", [".feather", ".parquet", ".csv"])
+def test_multi_chunk_table_round_trips(tmp_path, extension):
+    # Chunks this small infer different categories, so their Arrow dictionaries differ
+    chunks = [apply_schema(generate_chunk(20, seed)) for seed in range(10)]
+    assert len({tuple(chunk["EducationLevel"].cat.categories) for chunk in chunks}) > 1
+
+    file_path = str(tmp_path / f"table{extension}")
+    with TableWriter(file_path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    expected = pd.concat(chunks, ignore_index=True).astype({"EducationLevel": object, "LoanPurpose": object})
+    actual = load_table(file_path)
+
+    assert len(actual) == len(expected)
+    for column in ("EducationLevel", "LoanPurpose", "AnnualIncome"):
+        assert actual[column].astype(expected[column].dtype).tolist() == expected[column].tolist()